@@ -0,0 +1,229 @@
+import base64
+import functools
+import statistics
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import quote
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from foodgram.profiling import QueryCounter
+
+from recipes.catalogue import get_catalogue
+from recipes.management.commands.seed_benchmark_data import USERNAME_PREFIX
+from recipes.models import Recipe, User
+
+# Бюджеты запроса: число запросов к БД с прогретым кэшем и с пустым
+# (--cold), пик памяти в КБ. Превышение завершает команду с ошибкой.
+BUDGETS = {
+    'Лента, аноним': (1, 6, 256),
+    'Лента': (1, 7, 256),
+    'Лента по тегам': (1, 6, 256),
+    'Лента с фильтром': (6, 6, 256),
+    'Рецепт': (1, 6, 128),
+    'Подписки': (4, 4, 512),
+    'Список покупок': (2, 2, 128),
+    'Создание рецепта': (8, 9, 512),
+    # Зависит от того, сколько ингредиентов рецепта заменяется.
+    'Изменение рецепта': (31, 31, 512),
+}
+
+
+class Command(BaseCommand):
+    help = ('Измеряет время ответа, число запросов к БД и пик памяти '
+            'на основных запросах API и сверяет их с бюджетами. Данные '
+            'создает seed_benchmark_data')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом')
+        parser.add_argument(
+            '--server',
+            help='Адрес запущенного сервера, например http://localhost:8000: '
+                 'запросы на чтение отправляются по HTTP параллельно')
+        parser.add_argument(
+            '--concurrency', type=int, default=16,
+            help='Число одновременных запросов для --server')
+        parser.add_argument(
+            '--max-p95-ms', type=float,
+            help='Допустимое время ответа p95 в мс для всех запросов')
+
+    def handle(self, *args, **options):
+        user = (
+            User.objects.filter(username__startswith=USERNAME_PREFIX)
+            .order_by('pk').first()
+        )
+        if user is None:
+            raise CommandError(
+                'Нет тестовых данных, запустите seed_benchmark_data')
+        host = next(
+            (host for host in settings.ALLOWED_HOSTS if host[0] not in '*.'),
+            'localhost'
+        )
+        anonymous = APIClient(SERVER_NAME=host)
+        client = APIClient(SERVER_NAME=host)
+        client.force_authenticate(user)
+        catalogue = get_catalogue()
+        recipe = Recipe.objects.filter(author=user).first()
+        body = self.recipe_body(catalogue)
+        # Параметры страниц такие же, как в запросах фронтенда.
+        feed = '/api/recipes/?page=1&limit=6'
+        tags_feed = feed + ''.join(
+            f'&tags={tag["slug"]}' for tag in catalogue.tags[:2])
+        filtered_feed = (
+            f'{feed}&tags={catalogue.tags[0]["slug"]}&is_favorited=1')
+        subscriptions = (
+            '/api/users/subscriptions/?page=1&limit=6&recipes_limit=3')
+        if options['server']:
+            token = Token.objects.get_or_create(user=user)[0]
+            auth = {'Authorization': f'Token {token.key}'}
+            self.benchmark_server(options['server'], (
+                ('Лента, аноним', feed, {}),
+                ('Лента', feed, auth),
+                ('Лента по тегам', tags_feed, {}),
+                ('Лента с фильтром', filtered_feed, auth),
+                ('Рецепт', f'/api/recipes/{recipe.pk}/', auth),
+                ('Подписки', subscriptions, auth),
+                ('Теги', '/api/tags/', {}),
+                ('Ингредиенты', f'/api/ingredients/?name={quote("мо")}', {}),
+            ), options['repeat'], options['concurrency'],
+                options['max_p95_ms'])
+            return
+        cases = (
+            ('Лента, аноним', anonymous.get, feed, None),
+            ('Лента', client.get, feed, None),
+            ('Лента по тегам', anonymous.get, tags_feed, None),
+            ('Лента с фильтром', client.get, filtered_feed, None),
+            ('Рецепт', client.get, f'/api/recipes/{recipe.pk}/', None),
+            ('Подписки', client.get, subscriptions, None),
+            ('Список покупок', client.get,
+             '/api/recipes/download_shopping_cart/', None),
+            ('Создание рецепта', client.post, '/api/recipes/', body),
+            ('Изменение рецепта', client.patch,
+             f'/api/recipes/{recipe.pk}/', body),
+        )
+        self.stdout.write(
+            f'{"Запрос":<20}{"p50, мс":>10}{"p95, мс":>10}'
+            f'{"Запросов":>10}{"Пик, КБ":>10}')
+        failures = []
+        for name, method, url, data in cases:
+            self.request(method, url, data)
+            timings = []
+            for _ in range(options['repeat']):
+                self.prepare(options['cold'])
+                started = time.perf_counter()
+                self.request(method, url, data)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries = QueryCounter()
+            self.prepare(options['cold'])
+            with connection.execute_wrapper(queries):
+                self.request(method, url, data)
+            self.prepare(options['cold'])
+            tracemalloc.start()
+            self.request(method, url, data)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            timings.sort()
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            self.stdout.write(
+                f'{name:<20}{statistics.median(timings):>10.1f}'
+                f'{p95:>10.1f}{queries.count:>10}{peak // 1024:>10}')
+            warm_queries, cold_queries, max_peak = BUDGETS[name]
+            max_queries = cold_queries if options['cold'] else warm_queries
+            if queries.count > max_queries:
+                failures.append(
+                    f'{name}: запросов {queries.count} > {max_queries}')
+            if peak // 1024 > max_peak:
+                failures.append(f'{name}: пик {peak // 1024} КБ > {max_peak}')
+            failures.extend(self.check_time(name, p95, options['max_p95_ms']))
+        self.check_budgets(failures)
+
+    @staticmethod
+    def check_time(name, p95, max_p95):
+        if max_p95 is not None and p95 > max_p95:
+            return [f'{name}: p95 {p95:.1f} мс > {max_p95}']
+        return []
+
+    @staticmethod
+    def check_budgets(failures):
+        if failures:
+            raise CommandError(
+                'Превышены бюджеты:\n' + '\n'.join(failures))
+
+    def benchmark_server(self, server, cases, repeat, concurrency, max_p95):
+        """Пропускная способность сервера при concurrency клиентах."""
+        failures = []
+        self.stdout.write(
+            f'{"Запрос":<20}{"Запросов/с":>12}{"p50, мс":>10}{"p95, мс":>10}')
+        with ThreadPoolExecutor(concurrency) as executor:
+            for name, url, headers in cases:
+                fetch = functools.partial(
+                    self.fetch, server.rstrip('/') + url, headers)
+                list(executor.map(fetch, range(concurrency)))
+                started = time.perf_counter()
+                timings = sorted(
+                    executor.map(fetch, range(repeat * concurrency)))
+                elapsed = time.perf_counter() - started
+                p95 = timings[int(len(timings) * 0.95) - 1]
+                self.stdout.write(
+                    f'{name:<20}{len(timings) / elapsed:>12.0f}'
+                    f'{statistics.median(timings):>10.1f}{p95:>10.1f}')
+                failures.extend(self.check_time(name, p95, max_p95))
+        self.check_budgets(failures)
+
+    @staticmethod
+    def fetch(url, headers, _):
+        started = time.perf_counter()
+        with urlopen(Request(url, headers=headers)) as response:
+            response.read()
+        return (time.perf_counter() - started) * 1000
+
+    @staticmethod
+    def prepare(cold):
+        if cold:
+            # Справочники процесса перечитываются до замера: иначе это
+            # происходит в произвольном запросе, в зависимости от
+            # CATALOGUE_VERSION_CHECK_INTERVAL.
+            cache.clear()
+            get_catalogue(force=True)
+
+    @staticmethod
+    def request(method, url, data):
+        # Изменяющие запросы откатываются, чтобы не накапливать данные.
+        with transaction.atomic():
+            response = method(url, data, format='json')
+            if response.status_code >= 400:
+                raise CommandError(
+                    f'{url}: {response.status_code} {response.content[:200]}')
+            if response.streaming:
+                b''.join(response.streaming_content)
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def recipe_body(catalogue):
+        buffer = BytesIO()
+        Image.new('RGB', (640, 480), 'green').save(buffer, 'JPEG')
+        return {
+            'name': 'Рецепт для замера',
+            'text': 'Текст рецепта.',
+            'cooking_time': 30,
+            'image': 'data:image/jpeg;base64,' + base64.b64encode(
+                buffer.getvalue()).decode(),
+            'tags': [tag['id'] for tag in catalogue.tags[:2]],
+            'ingredients': [
+                {'id': ingredient['id'], 'amount': 100}
+                for ingredient in catalogue.ingredients[:8]
+            ],
+        }
@@ -1,8 +1,70 @@
+import hashlib
+import logging
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.http import Http404
 from django.shortcuts import get_object_or_404
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import http_date, quote_etag
 
 from rest_framework import status
 from rest_framework.response import Response
 
+from foodgram.profiling import QueryCounter
+
+from recipes.catalogue import get_catalogue
+from recipes.versions import get_version
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryBudgetMixin:
+    """Ограничивает число SQL-запросов на один вызов view.
+
+    `max_queries` задает постоянную часть бюджета: число или словарь
+    {action: число}, действия без бюджета не проверяются.
+    `max_queries_per_item` добавляет запросы на каждый элемент ответа
+    (страницы списка); ноль означает, что число запросов не зависит от
+    длины страницы. При QUERY_BUDGET_STRICT превышение вызывает
+    QueryBudgetExceeded, иначе пишется в лог.
+    """
+    max_queries = None
+    max_queries_per_item = 0
+
+    def get_query_budget(self, response):
+        budget = self.max_queries
+        if isinstance(budget, dict):
+            budget = budget.get(getattr(self, 'action', None))
+        if budget is None:
+            return None
+        data = getattr(response, 'data', None)
+        if isinstance(data, dict) and 'results' in data:
+            data = data['results']
+        items = len(data) if isinstance(data, list) else 1
+        return budget + self.max_queries_per_item * items
+
+    def dispatch(self, request, *args, **kwargs):
+        queries = QueryCounter()
+        with connection.execute_wrapper(queries):
+            response = super().dispatch(request, *args, **kwargs)
+        budget = self.get_query_budget(response)
+        if budget is not None and queries.count > budget:
+            message = (
+                f'{self.__class__.__name__}.{getattr(self, "action", None)}: '
+                f'{queries.count} SQL-запросов при бюджете {budget}')
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
 
 class AddRemoveListMixin:
 
@@ -13,10 +75,6 @@ class AddRemoveListMixin:
             field_name: qs_object
         }
         target_list = target_model.objects.filter(**target_kwargs)
-        deleted_msg = {
-            'detail': f'{qs_object._meta.verbose_name} удален из '
-                      f'списка {target_model._meta.verbose_name}'
-        }
         in_list_err_msg = {
             'errors': f'{qs_object._meta.verbose_name} уже есть '
                       f'в списке {target_model._meta.verbose_name}'
@@ -25,13 +83,24 @@ class AddRemoveListMixin:
             'errors': f'{qs_object._meta.verbose_name} нет в списке '
                       f'{target_model._meta.verbose_name}'
         }
+        self_err_msg = {
+            'errors': 'Нельзя добавить себя в список '
+                      f'{target_model._meta.verbose_name}'
+        }
+        if qs_object == self.request.user:
+            return Response(
+                self_err_msg,
+                status=status.HTTP_400_BAD_REQUEST
+            )
         if self.request.method == 'POST':
-            if target_list.exists():
+            try:
+                with transaction.atomic():
+                    target_model.objects.create(**target_kwargs)
+            except IntegrityError:
                 return Response(
                     in_list_err_msg,
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            target_model.objects.create(**target_kwargs)
             serializer = self.get_serializer_class()
             return Response(
                 serializer(
@@ -41,14 +110,144 @@ class AddRemoveListMixin:
                 status=status.HTTP_201_CREATED
             )
         if self.request.method == 'DELETE':
-            if target_list.exists():
-                target_list.delete()
-                return Response(
-                    deleted_msg,
-                    status=status.HTTP_204_NO_CONTENT
-                )
+            deleted, _ = target_list.delete()
+            if deleted:
+                # У ответа 204 не бывает тела, uvicorn такой ответ не
+                # отправит.
+                return Response(status=status.HTTP_204_NO_CONTENT)
             return Response(
                 not_in_list_err_msg,
                 status=status.HTTP_400_BAD_REQUEST
             )
         return None
+
+
+class ConditionalListRetrieveMixin:
+    """Добавляет ETag и Last-Modified к list и retrieve.
+
+    Валидаторы строятся по версии данных `version_key` из общего кэша,
+    без сериализации ответа, поэтому неизмененные данные возвращаются
+    ответом 304 до выполнения запросов к БД и сериализаторов. Если ответ
+    зависит от пользователя, `user_dependent` добавляет его в ETag.
+    """
+    version_key = None
+    user_dependent = False
+
+    def get_validators(self, request):
+        version = get_version(self.version_key)
+        etag = str(version)
+        if self.user_dependent:
+            etag = f'{etag}-{request.user.pk or 0}'
+        return quote_etag(etag), version // 10 ** 9
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (
+            status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED
+        ):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            patch_cache_control(response, no_cache=True)
+            if self.user_dependent:
+                patch_cache_control(response, private=True)
+                patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs)
+
+
+class SharedCacheListRetrieveMixin:
+    """Кэширует общие для всех пользователей ответы list и retrieve.
+
+    Ответ без пользовательских признаков одинаков для всех посетителей,
+    поэтому он сохраняется в кэше по нормализованным параметрам запроса
+    и версии данных `cache_version_key`. Попадание в кэш не выполняет
+    запросов к БД и сериализаторов; при изменении данных версия меняется
+    и старые записи перестают использоваться.
+
+    Наследники могут разрешить общий ответ авторизованным пользователям
+    (`is_shared_request`): перед сохранением пользовательские признаки
+    сбрасываются (`depersonalize`), а при выдаче накладываются заново
+    (`personalize`).
+    """
+    cache_version_key = None
+
+    def is_shared_request(self, request):
+        return request.user.is_anonymous
+
+    def depersonalize(self, data):
+        return data
+
+    def personalize(self, data, user):
+        return data
+
+    def get_cache_key(self, request):
+        params = urlencode(sorted(
+            (key, sorted(values))
+            for key, values in request.query_params.lists()
+        ), doseq=True)
+        raw_key = '|'.join((
+            str(get_version(self.cache_version_key)),
+            request.get_host(),
+            request.path,
+            params,
+        ))
+        return 'api:shared:' + hashlib.md5(raw_key.encode()).hexdigest()
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if not self.is_shared_request(request):
+            return handler(request, *args, **kwargs)
+        key = self.get_cache_key(request)
+        data = cache.get(key)
+        if data is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            data = self.depersonalize(response.data)
+            cache.set(key, data, settings.RESPONSE_CACHE_TIMEOUT)
+        if request.user.is_authenticated:
+            data = self.personalize(data, request.user)
+        return Response(data)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs)
+
+
+class CatalogueListRetrieveMixin:
+    """list и retrieve для справочников из памяти процесса.
+
+    Наследники возвращают из снимка справочника список для list
+    и элемент по id для retrieve.
+    """
+
+    def get_catalogue_list(self, catalogue):
+        raise NotImplementedError
+
+    def get_catalogue_item(self, catalogue, pk):
+        raise NotImplementedError
+
+    def list(self, request, *args, **kwargs):
+        return Response(self.get_catalogue_list(get_catalogue()))
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs.get(self.lookup_field, '')
+        item = None
+        if pk.isdigit():
+            item = self.get_catalogue_item(get_catalogue(), int(pk))
+        if item is None:
+            raise Http404
+        return Response(item)
@@ -0,0 +1,90 @@
+import csv
+
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson.
+
+    Байты совпадают с выводом JSONRenderer при настройках DRF по умолчанию
+    (компактный JSON без экранирования не-ASCII). Даты и типы, которых
+    нет в orjson, сериализует кодировщик DRF; ответы с отступами и
+    нестандартные настройки отдаются JSONRenderer.
+    """
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent or self.ensure_ascii or not self.compact:
+            return super().render(
+                data, accepted_media_type, renderer_context)
+        content = orjson.dumps(
+            data, default=self.encoder_class().default, option=self.options)
+        # JSONRenderer экранирует разделители строк, недопустимые в JS.
+        return content.replace(
+            '\u2028'.encode(), b'\\u2028').replace(
+            '\u2029'.encode(), b'\\u2029')
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """Базовый потоковый рендерер списка покупок.
+
+    Наследники описывают формат файла и реализуют `stream`, который
+    построчно превращает записи агрегата корзины в байты.
+    """
+    charset = 'utf-8'
+    filename = 'shopping-list'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Используется DRF только для ответов об ошибках.
+        if isinstance(data, dict) and 'detail' in data:
+            data = data['detail']
+        return str(data).encode(self.charset)
+
+    def get_filename(self):
+        return f'{self.filename}.{self.format}'
+
+    def stream(self, rows):
+        raise NotImplementedError('Метод stream() должен быть определен')
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, rows):
+        for row in rows:
+            yield (
+                f'''{row['name']} - {row['amount']} '''
+                f'''{row['measurement_unit']}\n'''
+            ).encode(self.charset)
+
+
+class Echo:
+    """Псевдофайл для csv.writer, возвращающий записанную строку."""
+    def write(self, value):
+        return value
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(
+            ('Ингредиент', 'Количество', 'Единицы измерения')
+        ).encode(self.charset)
+        for row in rows:
+            yield writer.writerow(
+                (row['name'], row['amount'], row['measurement_unit'])
+            ).encode(self.charset)
+
+
+SHOPPING_LIST_RENDERERS = (
+    ShoppingListTextRenderer,
+    ShoppingListCSVRenderer,
+)
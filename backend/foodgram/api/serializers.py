@@ -1,22 +1,82 @@
 import base64
+import binascii
+from collections import defaultdict
+from io import BytesIO
 
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.files.uploadedfile import (InMemoryUploadedFile,
+                                            TemporaryUploadedFile)
 from django.db import transaction
 
 from rest_framework import serializers
 
-from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag, User
+from recipes.catalogue import (get_ingredient, get_ingredients, get_positions,
+                               get_tags)
+from recipes.models import (Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingCartIngredient, Tag, User)
+from recipes.user_lists import get_user_lists
 from users.serializers import UserSerializer
 
 
 class Base64ImageField(serializers.ImageField):
-    """Декодирует base64 в картинку и сохраняет в media."""
+    """Декодирует base64 в картинку и сохраняет в media.
+
+    Строка декодируется кусками во временный файл: небольшие картинки
+    остаются в памяти, крупные уходят на диск. Тип и размер в байтах
+    проверяются до декодирования, размер в пикселях - по заголовку
+    картинки после проверки ImageField.
+    """
+    CHUNK_SIZE = 64 * 1024
+
     def to_internal_value(self, data):
-        if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
-        return super().to_internal_value(data)
+        if isinstance(data, str) and data.startswith('data:image/'):
+            data = self.decode(data)
+        image = super().to_internal_value(data)
+        self.validate_dimensions(*image.image.size)
+        return image
+
+    def decode(self, data):
+        start = data.find(';base64,', 0, 64)
+        if start == -1:
+            raise serializers.ValidationError('Некорректный формат картинки')
+        ext = data[len('data:image/'):start]
+        if ext not in settings.IMAGE_ALLOWED_TYPES:
+            raise serializers.ValidationError(
+                'Допустимые форматы картинки: '
+                f'{", ".join(settings.IMAGE_ALLOWED_TYPES)}')
+        start += len(';base64,')
+        size = (len(data) - start) * 3 // 4
+        if size > settings.IMAGE_MAX_UPLOAD_SIZE:
+            raise serializers.ValidationError(
+                'Картинка не должна быть больше '
+                f'{settings.IMAGE_MAX_UPLOAD_SIZE // 1024 // 1024} Мб')
+        name, content_type = f'temp.{ext}', f'image/{ext}'
+        if size > settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+            file = TemporaryUploadedFile(name, content_type, size, None)
+        else:
+            file = InMemoryUploadedFile(
+                BytesIO(), None, name, content_type, size, None)
+        try:
+            for offset in range(start, len(data), self.CHUNK_SIZE):
+                file.write(base64.b64decode(
+                    data[offset:offset + self.CHUNK_SIZE], validate=True))
+        except binascii.Error:
+            file.close()
+            raise serializers.ValidationError('Некорректный формат картинки')
+        file.size = file.tell()
+        file.seek(0)
+        return file
+
+    def validate_dimensions(self, width, height):
+        max_width, max_height = settings.IMAGE_MAX_SIZE
+        if width > max_width or height > max_height:
+            raise serializers.ValidationError(
+                'Размер картинки не должен превышать '
+                f'{max_width}x{max_height} пикселей')
+        if width * height > settings.IMAGE_MAX_PIXELS:
+            raise serializers.ValidationError(
+                'Картинка не должна содержать больше '
+                f'{settings.IMAGE_MAX_PIXELS} пикселей')
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -28,22 +88,22 @@ class IngredientSerializer(serializers.ModelSerializer):
 
 class IngredientInRecipeSerializer(serializers.ModelSerializer):
     """Сериализатор для отображения ингредиентов в рецепте."""
-    id = serializers.PrimaryKeyRelatedField(
-        source='ingredient',
-        queryset=Ingredient.objects.all()
-
-    )
-    name = serializers.ReadOnlyField(
-        source='ingredient.name',
-    )
-    measurement_unit = serializers.ReadOnlyField(
-        source='ingredient.measurement_unit',
-    )
+    id = serializers.IntegerField(source='ingredient_id')
+    name = serializers.SerializerMethodField()
+    measurement_unit = serializers.SerializerMethodField()
 
     class Meta:
         model = IngredientInRecipe
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
+    @staticmethod
+    def get_name(obj):
+        return get_ingredient(obj.ingredient_id)['name']
+
+    @staticmethod
+    def get_measurement_unit(obj):
+        return get_ingredient(obj.ingredient_id)['measurement_unit']
+
 
 class IngredientAddSerializer(serializers.Serializer):
     """Сериализатор для добавления ингредиентов в рецепт."""
@@ -62,7 +122,10 @@ class RecipeSerializer(serializers.ModelSerializer):
     """Сериализатор для рецептов."""
     is_favorited = serializers.BooleanField()
     is_in_shopping_cart = serializers.BooleanField()
-    ingredients = serializers.SerializerMethodField()
+    ingredients = IngredientInRecipeSerializer(
+        source='ingredientinrecipe_set',
+        many=True
+    )
     tags = TagSerializer(many=True)
     author = UserSerializer()
 
@@ -76,22 +139,128 @@ class RecipeSerializer(serializers.ModelSerializer):
                   'is_in_shopping_cart',
                   'name',
                   'image',
+                  'image_thumbnail',
+                  'image_medium',
                   'text',
                   'cooking_time'
                   )
+        read_only_fields = ('image_thumbnail', 'image_medium')
+
+
+class RecipeFeedSerializer:
+    """Быстрый сериализатор рецептов только для чтения.
+
+    Принимает строки `.values(*RecipeFeedSerializer.values_fields)` и
+    собирает те же словари, что RecipeSerializer, без создания полей DRF:
+    теги и ингредиенты берутся из справочника, связи и авторы читаются
+    одним запросом на страницу.
+    """
+    values_fields = (
+        'id', 'author_id', 'name', 'image', 'image_thumbnail',
+        'image_medium', 'text', 'cooking_time', 'is_favorited',
+        'is_in_shopping_cart',
+        # Нужны курсорной пагинации для позиции последнего рецепта.
+        'create_date', 'favorites_count',
+    )
+    author_fields = ('email', 'id', 'username', 'first_name', 'last_name',
+                     'is_subscribed')
+
+    def __init__(self, instance=None, many=False, context=None, **kwargs):
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+
+    @property
+    def data(self):
+        rows = list(self.instance) if self.many else [self.instance]
+        recipes = self.to_representation(rows)
+        return recipes if self.many else recipes[0]
+
+    def to_representation(self, rows):
+        if not rows:
+            return []
+        recipe_ids = [row['id'] for row in rows]
+        tags = self.get_tags(recipe_ids)
+        ingredients = self.get_ingredients(recipe_ids)
+        authors = self.get_authors({row['author_id'] for row in rows})
+        image_url = self.get_image_url
+        return [{
+            'id': row['id'],
+            'tags': tags[row['id']],
+            'author': dict(authors[row['author_id']]),
+            'ingredients': ingredients[row['id']],
+            'is_favorited': row['is_favorited'],
+            'is_in_shopping_cart': row['is_in_shopping_cart'],
+            'name': row['name'],
+            'image': image_url('image', row['image']),
+            'image_thumbnail': image_url(
+                'image_thumbnail', row['image_thumbnail']),
+            'image_medium': image_url('image_medium', row['image_medium']),
+            'text': row['text'],
+            'cooking_time': row['cooking_time'],
+        } for row in rows]
 
-    def get_ingredients(self, obj):
-        return IngredientInRecipeSerializer(
-            IngredientInRecipe.objects.filter(recipe=obj).all(),
-            many=True
-        ).data
+    @staticmethod
+    def get_tags(recipe_ids):
+        links = list(
+            Recipe.tags.through.objects
+            .filter(recipe_id__in=recipe_ids)
+            .order_by('tag__name')
+            .values_list('recipe_id', 'tag_id')
+        )
+        found = get_tags({tag_id for _, tag_id in links})
+        tags = defaultdict(list)
+        for recipe_id, tag_id in links:
+            tags[recipe_id].append(found[tag_id])
+        return tags
+
+    @staticmethod
+    def get_ingredients(recipe_ids):
+        # Порядок по названию ингредиента, как у ingredientinrecipe_set.
+        links = list(
+            IngredientInRecipe.objects
+            .filter(recipe_id__in=recipe_ids)
+            .values_list('recipe_id', 'ingredient_id', 'amount')
+        )
+        found = get_ingredients({link[1] for link in links})
+        ingredients = defaultdict(list)
+        for recipe_id, ingredient_id, amount in links:
+            ingredient = found[ingredient_id]
+            ingredients[recipe_id].append({
+                'id': ingredient_id,
+                'name': ingredient['name'],
+                'measurement_unit': ingredient['measurement_unit'],
+                'amount': amount,
+            })
+        return ingredients
+
+    def get_authors(self, author_ids):
+        request = self.context.get('request')
+        user_id = request.user.pk if request is not None else None
+        return {
+            author['id']: author for author in
+            User.objects
+            .add_subscription_annotation(user_id)
+            .filter(pk__in=author_ids)
+            .values(*self.author_fields)
+        }
+
+    def get_image_url(self, field_name, name):
+        if not name:
+            return None
+        url = Recipe._meta.get_field(field_name).storage.url(name)
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
 
 
 class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
     """Сериализатор для добавления и изменения рецептов."""
     image = Base64ImageField()
     ingredients = IngredientAddSerializer(many=True, write_only=True)
-    tags = serializers.ListField(write_only=True)
+    tags = serializers.ListField(
+        child=serializers.IntegerField(), write_only=True)
 
     class Meta:
         model = Recipe
@@ -103,6 +272,27 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
                   'cooking_time',
                   )
 
+    def validate_tags(self, tag_ids):
+        tag_ids = list(dict.fromkeys(tag_ids))
+        found = get_tags(tag_ids)
+        missing = [tag_id for tag_id in tag_ids if tag_id not in found]
+        if missing:
+            raise serializers.ValidationError(
+                f'Теги не найдены: {", ".join(map(str, missing))}')
+        return [Tag(**found[tag_id]) for tag_id in tag_ids]
+
+    def validate_ingredients(self, ingredients):
+        ingredient_ids = [ingredient.get('id') for ingredient in ingredients]
+        found = get_ingredients(ingredient_ids)
+        missing = [
+            ingredient_id for ingredient_id in dict.fromkeys(ingredient_ids)
+            if ingredient_id not in found
+        ]
+        if missing:
+            raise serializers.ValidationError(
+                f'Ингредиенты не найдены: {", ".join(map(str, missing))}')
+        return ingredients
+
     def validate(self, data):
         if not data.get('tags'):
             raise serializers.ValidationError(
@@ -130,7 +320,7 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
             author=self.context.get("request").user,
             **validated_data
         )
-        recipe.tags.add(*tags)
+        recipe.tags.add(*(tag.id for tag in tags))
         ingredients_to_recipe = [
             IngredientInRecipe(
                 recipe=recipe,
@@ -139,27 +329,111 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
             ) for ingredient in ingredients
         ]
         IngredientInRecipe.objects.bulk_create(ingredients_to_recipe)
+        self.cache_related(recipe, tags, ingredients_to_recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
-        instance.tags.clear()
-        instance.tags.add(*tags)
-        IngredientInRecipe.objects.filter(recipe_id=instance.pk).delete()
-        ingredients_to_recipe = [
-            IngredientInRecipe(
-                recipe=instance,
-                ingredient_id=ingredient.get('id'),
-                amount=ingredient.get('amount')
-            ) for ingredient in ingredients
-        ]
-        IngredientInRecipe.objects.bulk_create(ingredients_to_recipe)
+        image = validated_data.get('image')
+        if image and instance.image:
+            name = instance.image.field.generate_filename(instance, image.name)
+            storage = instance.image.storage
+            if storage.content_name(name, image) == instance.image.name:
+                # Фронтенд присылает картинку заново при каждом изменении.
+                del validated_data['image']
+        if 'image' in validated_data:
+            # Копии старой картинки не должны попасть в ответы, пока
+            # строятся новые.
+            for rendition in settings.IMAGE_RENDITIONS:
+                validated_data[f'image_{rendition}'] = ''
+        self.update_tags(instance, tags)
+        ingredients = self.update_ingredients(instance, ingredients)
         super().update(instance, validated_data)
+        self.cache_related(instance, tags, ingredients)
         return instance
 
+    def update_tags(self, instance, tags):
+        current = {tag.id for tag in instance.tags.all()}
+        submitted = {tag.id for tag in tags}
+        if current - submitted:
+            instance.tags.remove(*(current - submitted))
+        if submitted - current:
+            instance.tags.add(*(submitted - current))
+
+    def update_ingredients(self, instance, ingredients):
+        """Меняет только добавленные, удаленные и измененные ингредиенты.
+
+        Текущие строки берутся из prefetch_related рецепта (with_related).
+        """
+        current = {
+            item.ingredient_id: item
+            for item in instance.ingredientinrecipe_set.all()
+        }
+        submitted = {
+            ingredient.get('id'): ingredient.get('amount')
+            for ingredient in ingredients
+        }
+        removed = current.keys() - submitted.keys()
+        if removed:
+            IngredientInRecipe.objects.filter(
+                recipe=instance, ingredient_id__in=removed
+            ).delete()
+        added = [
+            IngredientInRecipe(
+                recipe=instance, ingredient_id=ingredient_id, amount=amount)
+            for ingredient_id, amount in submitted.items()
+            if ingredient_id not in current
+        ]
+        changed = []
+        for ingredient_id, amount in submitted.items():
+            item = current.get(ingredient_id)
+            if item is not None and item.amount != amount:
+                item.amount = amount
+                changed.append(item)
+        IngredientInRecipe.objects.bulk_create(added)
+        IngredientInRecipe.objects.bulk_update(changed, ['amount'])
+        if added or changed:
+            # bulk-операции не отправляют сигналы, поэтому агрегат
+            # корзины обновляется здесь.
+            ShoppingCartIngredient.objects.refresh(
+                instance.recipe_carts.values_list('user_id', flat=True),
+                [item.ingredient_id for item in added + changed]
+            )
+        rows = {item.ingredient_id: item for item in added}
+        rows.update(current)
+        return [rows[ingredient_id] for ingredient_id in submitted]
+
+    @staticmethod
+    def cache_related(recipe, tags, ingredients):
+        """Кладет сохраненные теги и ингредиенты в кэш prefetch_related,
+        чтобы ответ собирался без повторных запросов. Порядок берется из
+        снимка справочников, то есть совпадает с сортировкой в БД."""
+        tag_positions = get_positions(
+            'tag_positions', [tag.id for tag in tags])
+        ingredient_positions = get_positions(
+            'ingredient_positions',
+            [item.ingredient_id for item in ingredients])
+        recipe._prefetched_objects_cache = {
+            'tags': sorted(
+                tags,
+                key=lambda tag: tag_positions.get(tag.id, len(tag_positions))
+            ),
+            'ingredientinrecipe_set': sorted(
+                ingredients,
+                key=lambda item: ingredient_positions.get(
+                    item.ingredient_id, len(ingredient_positions))
+            ),
+        }
+
     def to_representation(self, instance):
-        serializer = RecipeSerializer(instance)
+        user_lists = get_user_lists(self.context.get('request').user.pk)
+        instance.is_favorited = instance.pk in user_lists.favorited
+        instance.is_in_shopping_cart = instance.pk in user_lists.in_cart
+        instance.author.is_subscribed = (
+            instance.author_id in user_lists.subscribed)
+        serializer = RecipeSerializer(instance, context=self.context)
         return serializer.data
 
 
@@ -167,13 +441,14 @@ class RecipeShortSerializer(serializers.ModelSerializer):
     """Сериализатор для отображения рецептов в подписке."""
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_thumbnail', 'cooking_time')
+        read_only_fields = ('image_thumbnail',)
 
 
 class SubscriptionListSerializer(UserSerializer):
     """Сериализатор для отображения подписок пользователя."""
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.ReadOnlyField()
 
     class Meta:
         model = User
@@ -193,10 +468,6 @@ class SubscriptionListSerializer(UserSerializer):
         queryset = obj.user_recipes.all()
         if request:
             recipes_limit = request.query_params.get('recipes_limit', None)
-            if recipes_limit:
+            if recipes_limit and recipes_limit.isdigit():
                 queryset = queryset[:int(recipes_limit)]
         return RecipeShortSerializer(queryset, many=True).data
-
-    @staticmethod
-    def get_recipes_count(obj):
-        return obj.user_recipes.all().count()
@@ -0,0 +1,41 @@
+import asyncio
+import threading
+
+from django.http import StreamingHttpResponse
+from django.test import SimpleTestCase
+
+from foodgram.asgi_handler import ThreadPoolASGIHandler
+
+
+class StreamingResponseTest(SimpleTestCase):
+    """Потоковый ответ читается в пуле по частям, а не целиком."""
+
+    def test_parts_are_sent_as_they_are_read(self):
+        read = []
+        sent = []
+
+        def content():
+            for part in (b'first', b'second', b'third'):
+                read.append(threading.current_thread().name)
+                yield part
+
+        async def send(message):
+            sent.append((len(read), message))
+
+        response = StreamingHttpResponse(content(), content_type='text/plain')
+        response['Content-Disposition'] = 'attachment; filename="list.txt"'
+        asyncio.run(ThreadPoolASGIHandler().send_response(response, send))
+
+        start, *body, end = (message for _, message in sent)
+        self.assertEqual(start['status'], 200)
+        self.assertIn(
+            (b'Content-Disposition', b'attachment; filename="list.txt"'),
+            start['headers']
+        )
+        self.assertEqual(
+            [message['body'] for message in body],
+            [b'first', b'second', b'third']
+        )
+        self.assertEqual(end, {'type': 'http.response.body'})
+        self.assertEqual([count for count, _ in sent[1:4]], [1, 2, 3])
+        self.assertTrue(all(name.startswith('asgi') for name in read))
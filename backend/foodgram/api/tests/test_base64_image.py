@@ -0,0 +1,97 @@
+import os
+import tracemalloc
+from io import BytesIO
+
+from django.test import SimpleTestCase, override_settings
+
+from api.serializers import Base64ImageField
+from PIL import Image
+from rest_framework import serializers
+
+from recipes.tests.cases import MediaTestCase
+from recipes.tests.factories import (create_image, create_ingredients,
+                                     create_tags, create_user, image_data_url)
+
+
+class ImageSerializer(serializers.Serializer):
+    image = Base64ImageField()
+
+
+class Base64ImageFieldTest(SimpleTestCase):
+    """Некорректные картинки отклоняются ошибкой валидации."""
+
+    def assert_invalid(self, data):
+        serializer = ImageSerializer(data={'image': data})
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('image', serializer.errors)
+
+    def test_valid(self):
+        serializer = ImageSerializer(
+            data={'image': image_data_url(create_image(size=(3, 2)))})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(
+            serializer.validated_data['image'].image.size, (3, 2))
+
+    def test_not_an_image(self):
+        self.assert_invalid('data:image/png;base64,aGVsbG8gd29ybGQh')
+
+    def test_empty(self):
+        self.assert_invalid('data:image/png;base64,')
+
+    def test_broken_base64(self):
+        self.assert_invalid('data:image/png;base64,not base64!')
+
+    def test_type_not_allowed(self):
+        self.assert_invalid(image_data_url(create_image('BMP'), 'bmp'))
+
+    @override_settings(IMAGE_MAX_SIZE=(4, 4))
+    def test_too_large(self):
+        self.assert_invalid(image_data_url(create_image(size=(5, 4))))
+
+    @override_settings(IMAGE_MAX_UPLOAD_SIZE=100)
+    def test_too_many_bytes(self):
+        self.assert_invalid(image_data_url(b'0' * 200))
+
+    def test_peak_memory(self):
+        # Около 4 Мб шума: картинка декодируется во временный файл
+        # кусками и не загружается в память целиком.
+        buffer = BytesIO()
+        Image.frombytes(
+            'RGB', (1200, 1200), os.urandom(1200 * 1200 * 3)
+        ).save(buffer, 'PNG')
+        data = image_data_url(buffer.getvalue())
+        del buffer
+        tracemalloc.start()
+        try:
+            Base64ImageField().to_internal_value(data)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, 1024 * 1024)
+
+
+class RecipeImageValidationTest(MediaTestCase):
+    """Создание рецепта с некорректной картинкой возвращает 400."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.tags = create_tags(1)
+        cls.ingredients = create_ingredients(1)
+
+    def test_invalid_image(self):
+        self.client.force_authenticate(self.user)
+        for image in ('data:image/png;base64,aGVsbG8gd29ybGQh',
+                      'data:image/png;base64,'):
+            with self.subTest(image=image):
+                response = self.client.post('/api/recipes/', {
+                    'name': 'Рецепт',
+                    'text': 'Описание',
+                    'cooking_time': 5,
+                    'tags': [self.tags[0].pk],
+                    'ingredients': [
+                        {'id': self.ingredients[0].pk, 'amount': 1}],
+                    'image': image,
+                }, format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('image', response.data)
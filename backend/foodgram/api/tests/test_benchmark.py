@@ -0,0 +1,53 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TransactionTestCase, override_settings
+
+from recipes.models import Recipe
+from recipes.tests.cases import TempMediaMixin
+from recipes.tests.factories import create_ingredients, create_tags
+
+
+@override_settings(CATALOGUE_VERSION_CHECK_INTERVAL=0)
+class BenchmarkCommandTest(TempMediaMixin, TransactionTestCase):
+    """Замер API укладывается в бюджеты и падает при их превышении.
+
+    Команда выполняет запросы в своих транзакциях, поэтому тест не
+    оборачивается в транзакцию и считает запросы так же, как на стенде.
+    """
+
+    def setUp(self):
+        cache.clear()
+        create_tags(3)
+        create_ingredients(10)
+        call_command(
+            'seed_benchmark_data', users=4, recipes_per_user=2,
+            ingredients_per_recipe=3, favorites_per_user=2,
+            carts_per_user=2, subscriptions_per_user=2,
+            stdout=StringIO(), stderr=StringIO())
+
+    def benchmark(self, *args):
+        output = StringIO()
+        call_command('benchmark_api', '--repeat', '1', *args, stdout=output)
+        return output.getvalue()
+
+    def test_seed(self):
+        self.assertEqual(Recipe.objects.count(), 8)
+
+    def test_within_budgets(self):
+        for args in ((), ('--cold',)):
+            with self.subTest(args=args):
+                self.assertIn('Лента', self.benchmark(*args))
+
+    def test_query_budget_exceeded(self):
+        budgets = {'Лента': (0, 0, 256)}
+        with mock.patch.dict(
+                'api.management.commands.benchmark_api.BUDGETS', budgets):
+            with self.assertRaisesMessage(CommandError, 'Лента: запросов'):
+                self.benchmark()
+
+    def test_time_budget_exceeded(self):
+        with self.assertRaisesMessage(CommandError, 'p95'):
+            self.benchmark('--max-p95-ms', '0')
@@ -0,0 +1,69 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from recipes.models import Recipe
+from recipes.tests.cases import CacheTestCase
+from recipes.tests.factories import create_recipes, create_user
+
+ORDERINGS = {
+    '': ('-create_date', '-id'),
+    'popular': ('-favorites_count', '-create_date', '-id'),
+}
+
+
+class RecipeCursorPaginationTest(CacheTestCase):
+    """Курсор проходит ленту с повторяющимися ключами сортировки без
+    пропусков и OFFSET."""
+
+    @classmethod
+    def setUpTestData(cls):
+        recipes = create_recipes(23, create_user())
+        # Одинаковые даты и счетчики у большинства рецептов.
+        Recipe.objects.update(create_date=timezone.now())
+        Recipe.objects.filter(
+            pk__in=[recipe.pk for recipe in recipes[::5]]
+        ).update(favorites_count=2)
+
+    def get_page(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        for query in queries:
+            self.assertNotIn('OFFSET', query['sql'])
+        return response.data
+
+    def walk(self, url, link):
+        ids = []
+        pages = 0
+        while url:
+            page = self.get_page(url)
+            ids.append([recipe['id'] for recipe in page['results']])
+            url = page[link]
+            pages += 1
+        return ids, pages
+
+    def test_forward_and_back(self):
+        for ordering, fields in ORDERINGS.items():
+            expected = list(
+                Recipe.objects.order_by(*fields).values_list('id', flat=True))
+            with self.subTest(ordering=ordering):
+                pages, total = self.walk(
+                    f'/api/recipes/?ordering={ordering}&limit=4&cursor=',
+                    'next')
+                self.assertEqual(total, 6)
+                self.assertEqual(sum(pages, []), expected)
+                last = self.get_page(
+                    f'/api/recipes/?ordering={ordering}&limit=4&cursor=')
+                while last['next']:
+                    last = self.get_page(last['next'])
+                back, _ = self.walk(last['previous'], 'previous')
+                self.assertEqual(sum(reversed(back), []), expected[:20])
+
+    def test_invalid_cursor(self):
+        for cursor in ('bad', 'cD0x', 'cD1bIngiXQ==',
+                       'cD1bIngiLCJ5IiwieiJd'):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(
+                    f'/api/recipes/?ordering=popular&cursor={cursor}')
+                self.assertEqual(response.status_code, 404)
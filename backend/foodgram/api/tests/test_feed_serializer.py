@@ -0,0 +1,96 @@
+from api.renderers import FastJSONRenderer
+from api.serializers import RecipeFeedSerializer, RecipeSerializer
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from recipes.models import (FavoriteRecipes, Ingredient, Recipe, ShoppingCarts,
+                            Tag)
+from recipes.tests.cases import CacheTestCase
+from recipes.tests.factories import create_recipe, create_user
+from users.models import Subscription
+
+# Кавычки, обратная косая черта, управляющие символы, эмодзи, разделители
+# строк JavaScript и не-ASCII.
+TRICKY = 'Борщ "с\\пампушками"\t\x01 🍲 </script>\u2028\u2029ё'
+
+
+class RecipeFeedSerializerTest(CacheTestCase):
+    """RecipeFeedSerializer с FastJSONRenderer дает те же байты, что
+    RecipeSerializer с JSONRenderer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        author = create_user(first_name=TRICKY, last_name='O\'Brien')
+        tags = [
+            Tag.objects.create(
+                name=TRICKY, color='#FFA500', slug='tricky-tag'),
+            Tag.objects.create(name='Полдник', color='#00FF00',
+                               slug='test-tag'),
+        ]
+        ingredients = [
+            Ingredient.objects.create(name=TRICKY, measurement_unit='г'),
+            Ingredient.objects.create(
+                name='соль морская', measurement_unit='щепоть'),
+        ]
+        recipes = [
+            create_recipe(author, tags, ingredients, name=TRICKY, text=TRICKY),
+            create_recipe(author, tags[1:], ingredients[1:]),
+            create_recipe(
+                cls.user, tags[:1], ingredients[:1],
+                image_thumbnail='recipes/renditions/test_thumbnail.webp',
+                image_medium='recipes/renditions/test_medium.webp'),
+        ]
+        FavoriteRecipes.objects.create(user=cls.user, recipe=recipes[0])
+        ShoppingCarts.objects.create(user=cls.user, recipe=recipes[1])
+        Subscription.objects.create(user=cls.user, author=author)
+        Recipe.objects.filter(pk=recipes[1].pk).update(favorites_count=5)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def reference(self, recipe_ids, request):
+        recipes = Recipe.objects.add_user_annotations(
+            self.user.pk).with_related(self.user.pk).in_bulk(recipe_ids)
+        return RecipeSerializer(
+            [recipes[pk] for pk in recipe_ids], many=True,
+            context={'request': request}).data
+
+    def test_serializers(self):
+        request = APIRequestFactory().get('/api/recipes/')
+        request.user = self.user
+        rows = Recipe.objects.add_user_annotations(self.user.pk).values(
+            *RecipeFeedSerializer.values_fields)
+        fast = FastJSONRenderer().render(RecipeFeedSerializer(
+            rows, many=True, context={'request': request}).data)
+        expected = JSONRenderer().render(self.reference(
+            [row['id'] for row in rows], request))
+        self.assertEqual(fast, expected)
+
+    def test_list(self):
+        for url in ('/api/recipes/',
+                    '/api/recipes/?cursor=',
+                    '/api/recipes/?ordering=popular&cursor=',
+                    '/api/recipes/?is_favorited=1'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                recipe_ids = [
+                    recipe['id'] for recipe in response.data['results']]
+                self.assertTrue(recipe_ids)
+                expected = JSONRenderer().render({
+                    **response.data,
+                    'results': self.reference(
+                        recipe_ids, response.wsgi_request),
+                })
+                self.assertEqual(response.content, expected)
+
+    def test_retrieve(self):
+        for recipe in Recipe.objects.all():
+            with self.subTest(recipe=recipe.pk):
+                response = self.client.get(f'/api/recipes/{recipe.pk}/')
+                self.assertEqual(response.status_code, 200)
+                expected = JSONRenderer().render(
+                    self.reference([recipe.pk], response.wsgi_request)[0])
+                self.assertEqual(response.content, expected)
@@ -0,0 +1,63 @@
+from django.core.cache import cache
+from django.test import override_settings
+
+from rest_framework.authtoken.models import Token
+
+from recipes.models import FavoriteRecipes, ShoppingCarts
+from recipes.tests.cases import CacheTestCase
+from recipes.tests.factories import (create_ingredients, create_recipes,
+                                     create_tags, create_user)
+from users.models import Subscription
+
+ANONYMOUS_URLS = (
+    '/api/recipes/?limit={limit}',
+    '/api/recipes/?limit={limit}&cursor=',
+    '/api/recipes/?limit={limit}&ordering=popular&cursor=',
+    '/api/recipes/?limit={limit}&tags={tag}&author={author}',
+    '/api/recipes/{recipe}/',
+    '/api/tags/',
+    '/api/ingredients/?name=Ингр',
+)
+USER_URLS = ANONYMOUS_URLS + (
+    '/api/recipes/?limit={limit}&tags={tag}&is_favorited=1',
+    '/api/recipes/?limit={limit}&is_in_shopping_cart=1',
+    '/api/users/subscriptions/?limit={limit}&recipes_limit={limit}',
+)
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class QueryBudgetTest(CacheTestCase):
+    """Бюджеты запросов view выдерживаются на пустом кэше при
+    авторизации по токену и любой длине страницы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.author = create_user()
+        cls.tags = create_tags(3)
+        recipes = create_recipes(
+            12, cls.author, cls.tags, create_ingredients(8))
+        for model in (FavoriteRecipes, ShoppingCarts):
+            model.objects.bulk_create(
+                model(user=cls.user, recipe=recipe) for recipe in recipes)
+        Subscription.objects.create(user=cls.user, author=cls.author)
+        cls.recipe = recipes[0]
+        cls.token = Token.objects.create(user=cls.user)
+
+    def assert_within_budgets(self, urls, **headers):
+        for limit in (1, 200):
+            for url in urls:
+                url = url.format(
+                    limit=limit, tag=self.tags[0].slug,
+                    author=self.author.pk, recipe=self.recipe.pk)
+                with self.subTest(url=url):
+                    cache.clear()
+                    response = self.client.get(url, **headers)
+                    self.assertEqual(response.status_code, 200)
+
+    def test_anonymous(self):
+        self.assert_within_budgets(ANONYMOUS_URLS)
+
+    def test_token(self):
+        self.assert_within_budgets(
+            USER_URLS, HTTP_AUTHORIZATION=f'Token {self.token.key}')
@@ -0,0 +1,64 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import FavoriteRecipes, ShoppingCarts
+from recipes.tests.cases import CacheTestCase
+from recipes.tests.factories import (create_ingredients, create_recipes,
+                                     create_tags, create_user)
+
+FEED_URLS = (
+    '/api/recipes/',
+    '/api/recipes/?cursor=',
+    '/api/recipes/?ordering=popular&cursor=',
+    '/api/recipes/?tags={tag}',
+)
+USER_FEED_URLS = FEED_URLS + (
+    '/api/recipes/?is_favorited=1',
+    '/api/recipes/?is_in_shopping_cart=1',
+)
+
+
+class RecipeFeedQueriesTest(CacheTestCase):
+    """Число запросов ленты не зависит от длины страницы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.author = create_user()
+        cls.tags = create_tags(3)
+        cls.ingredients = create_ingredients(5)
+
+    def get_feed(self, url):
+        cache.clear()
+        response = self.client.get(url.format(tag=self.tags[0].slug))
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.get_feed(url)
+        return len(queries)
+
+    def add_recipes(self, total):
+        recipes = create_recipes(
+            total, self.author, self.tags, self.ingredients)
+        for model in (FavoriteRecipes, ShoppingCarts):
+            model.objects.bulk_create(
+                model(user=self.user, recipe=recipe) for recipe in recipes)
+
+    def assert_constant_queries(self, urls):
+        self.add_recipes(1)
+        single = {url: self.count_queries(url) for url in urls}
+        self.add_recipes(9)
+        for url in urls:
+            with self.subTest(url=url), self.assertNumQueries(single[url]):
+                response = self.get_feed(url)
+            self.assertEqual(len(response.data['results']), 10)
+
+    def test_anonymous_feed(self):
+        self.assert_constant_queries(FEED_URLS)
+
+    def test_authenticated_feed(self):
+        self.client.force_authenticate(self.user)
+        self.assert_constant_queries(USER_FEED_URLS)
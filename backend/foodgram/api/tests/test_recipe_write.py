@@ -0,0 +1,80 @@
+from collections import Counter
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Ingredient, Tag
+from recipes.tests.cases import MediaTestCase
+from recipes.tests.factories import create_image, create_user, image_data_url
+
+
+class RecipeWriteOrderTest(MediaTestCase):
+    """Ответ на создание и изменение рецепта упорядочен как чтение."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        names = ('яблоко', 'Ёжевика', 'ёлка', 'Абрикос', 'банан', 'Банан',
+                 'éclair', 'Zucchini')
+        cls.tags = Tag.objects.bulk_create(
+            Tag(name=name, color='#FFA500', slug=f'tag{number}')
+            for number, name in enumerate(names)
+        )
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit='г') for name in names)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def payload(self, items):
+        return {
+            'name': 'Рецепт',
+            'text': 'Описание',
+            'cooking_time': 5,
+            'image': image_data_url(create_image()),
+            'tags': [tag.pk for tag in reversed(self.tags[:items])],
+            'ingredients': [
+                {'id': ingredient.pk, 'amount': amount}
+                for amount, ingredient in enumerate(
+                    reversed(self.ingredients[:items]), start=1)
+            ],
+        }
+
+    def assert_matches_detail(self, response):
+        detail = self.client.get(f'/api/recipes/{response.data["id"]}/')
+        for field in ('tags', 'ingredients'):
+            with self.subTest(field=field):
+                self.assertEqual(
+                    [item['id'] for item in response.data[field]],
+                    [item['id'] for item in detail.data[field]])
+
+    def test_create(self):
+        response = self.client.post(
+            '/api/recipes/', self.payload(len(self.tags)), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assert_matches_detail(response)
+
+    def test_update(self):
+        response = self.client.post(
+            '/api/recipes/', self.payload(2), format='json')
+        response = self.client.patch(
+            f'/api/recipes/{response.data["id"]}/',
+            self.payload(len(self.tags)), format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assert_matches_detail(response)
+
+    def test_update_without_repeated_queries(self):
+        response = self.client.post(
+            '/api/recipes/', self.payload(2), format='json')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.patch(
+                f'/api/recipes/{response.data["id"]}/',
+                self.payload(3), format='json')
+        repeated = [
+            sql for sql, total in Counter(
+                query['sql'] for query in queries.captured_queries
+            ).items()
+            if total > 1 and sql.startswith('SELECT')
+        ]
+        self.assertEqual(repeated, [])
@@ -0,0 +1,104 @@
+import csv
+import io
+import tracemalloc
+
+from recipes.models import Ingredient, ShoppingCartIngredient, ShoppingCarts
+from recipes.tests.cases import CacheTestCase
+from recipes.tests.factories import (create_ingredients, create_recipe,
+                                     create_user)
+
+URL = '/api/recipes/download_shopping_cart/'
+
+
+class ShoppingListDownloadTest(CacheTestCase):
+    """Список покупок отдается потоком в форматах txt и csv."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        ingredients = create_ingredients(2)
+        first = create_recipe(cls.user, ingredients=ingredients)
+        second = create_recipe(cls.user, ingredients=ingredients[:1])
+        for recipe in (first, second):
+            ShoppingCarts.objects.create(user=cls.user, recipe=recipe)
+        cls.ingredients = ingredients
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def download(self, **kwargs):
+        response = self.client.get(URL, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response
+
+    def test_text(self):
+        response = self.download()
+        self.assertEqual(response['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertIn('shopping-list.txt', response['Content-Disposition'])
+        first, second = self.ingredients
+        self.assertEqual(
+            b''.join(response.streaming_content).decode(),
+            f'{first.name} - 2 {first.measurement_unit}\n'
+            f'{second.name} - 2 {second.measurement_unit}\n'
+        )
+
+    def test_csv(self):
+        for kwargs in ({'data': {'format': 'csv'}},
+                       {'HTTP_ACCEPT': 'text/csv'}):
+            with self.subTest(**kwargs):
+                response = self.download(**kwargs)
+                self.assertEqual(
+                    response['Content-Type'], 'text/csv; charset=utf-8')
+                rows = list(csv.reader(io.StringIO(
+                    b''.join(response.streaming_content).decode())))
+                self.assertEqual(
+                    rows[0],
+                    ['Ингредиент', 'Количество', 'Единицы измерения'])
+                self.assertEqual(
+                    [row[:2] for row in rows[1:]],
+                    [[ingredient.name, '2']
+                     for ingredient in self.ingredients])
+
+    def test_anonymous(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(URL).status_code, 401)
+
+
+class ShoppingListMemoryTest(CacheTestCase):
+    """Пик памяти при выгрузке не растет с длиной списка."""
+
+    def fill_cart(self, user, total):
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'{user.pk} ингредиент {number:06}',
+                       measurement_unit='г')
+            for number in range(total)
+        )
+        ShoppingCartIngredient.objects.bulk_create(
+            ShoppingCartIngredient(
+                user=user, ingredient=ingredient, amount=number)
+            for number, ingredient in enumerate(ingredients, start=1)
+        )
+
+    def peak_memory(self, total):
+        user = create_user()
+        self.fill_cart(user, total)
+        self.client.force_authenticate(user)
+        tracemalloc.start()
+        try:
+            lines = 0
+            for chunk in self.client.get(URL).streaming_content:
+                lines += chunk.count(b'\n')
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(lines, total)
+        return peak
+
+    def test_peak_memory(self):
+        # Записи читаются из БД пачками по 2000 строк, поэтому втрое
+        # более длинный список не требует заметно больше памяти.
+        small = self.peak_memory(10000)
+        large = self.peak_memory(30000)
+        self.assertLess(large, small * 1.5)
@@ -0,0 +1,35 @@
+from recipes.tests.cases import CacheTestCase
+from recipes.tests.factories import create_recipes, create_user
+from users.models import Subscription
+
+
+class RecipesLimitTest(CacheTestCase):
+    """recipes_limit ограничивает рецепты авторов, нечисловой
+    игнорируется."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.author = create_user()
+        create_recipes(3, cls.author)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def test_list(self):
+        Subscription.objects.create(user=self.user, author=self.author)
+        for recipes_limit, total in (('2', 2), ('x', 3), ('-1', 3)):
+            with self.subTest(recipes_limit=recipes_limit):
+                response = self.client.get(
+                    '/api/users/subscriptions/',
+                    {'recipes_limit': recipes_limit})
+                self.assertEqual(response.status_code, 200)
+                author, = response.data['results']
+                self.assertEqual(len(author['recipes']), total)
+
+    def test_subscribe(self):
+        response = self.client.post(
+            f'/api/users/{self.author.pk}/subscribe/?recipes_limit=x')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['recipes']), 3)
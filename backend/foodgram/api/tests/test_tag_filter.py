@@ -0,0 +1,55 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.tests.cases import CacheTestCase
+from recipes.tests.factories import create_recipe, create_tags, create_user
+
+URL = '/api/recipes/'
+
+
+class RecipeTagFilterTest(CacheTestCase):
+    """Фильтр по тегам: рецепты с любым из тегов, без дублей."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user()
+        cls.breakfast, cls.lunch, cls.dinner = create_tags(3)
+        cls.both = create_recipe(author, [cls.breakfast, cls.lunch])
+        cls.lunch_only = create_recipe(author, [cls.lunch])
+        cls.dinner_only = create_recipe(author, [cls.dinner])
+
+    def filter_ids(self, *slugs):
+        response = self.client.get(URL, {'tags': slugs})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_any_tag(self):
+        self.assertEqual(
+            self.filter_ids(self.breakfast.slug, self.lunch.slug),
+            [self.lunch_only.pk, self.both.pk])
+        self.assertEqual(
+            self.filter_ids(self.dinner.slug), [self.dinner_only.pk])
+
+    def test_unknown_tag(self):
+        self.assertEqual(self.filter_ids('unknown'), [])
+        self.assertEqual(
+            self.filter_ids('unknown', self.dinner.slug),
+            [self.dinner_only.pk])
+
+    def test_count(self):
+        response = self.client.get(
+            URL, {'tags': [self.breakfast.slug, self.lunch.slug]})
+        self.assertEqual(response.data['count'], 2)
+
+    def test_exists_without_distinct(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.filter_ids(self.breakfast.slug, self.lunch.slug)
+        recipe_queries = [
+            query['sql'] for query in queries.captured_queries
+            if 'recipes_recipe_tags' in query['sql']
+            and 'FROM "recipes_recipe"' in query['sql']
+        ]
+        self.assertTrue(recipe_queries)
+        for sql in recipe_queries:
+            self.assertIn('EXISTS', sql)
+            self.assertNotIn('DISTINCT', sql)
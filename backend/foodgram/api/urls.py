@@ -2,8 +2,9 @@ from django.urls import include, path
 
 from rest_framework.routers import DefaultRouter
 
-from .views import (IngredientViewSet, RecipeViewSet,
-                    SubscriptionActionViewSet, SubscriptionViewSet, TagViewSet)
+from .views import (IngredientViewSet, ProfilingStatsView, RecipeViewSet,
+                    SubscriptionActionViewSet, SubscriptionViewSet, TagViewSet,
+                    UserViewSet)
 
 app_name = 'api'
 
@@ -23,9 +24,12 @@ router_v1.register('users/subscriptions',
 router_v1.register('users',
                    SubscriptionActionViewSet,
                    basename='users_subscribe_action')
+router_v1.register('users',
+                   UserViewSet,
+                   basename='user')
 
 urlpatterns = [
     path('', include(router_v1.urls)),
-    path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
+    path('profiling/', ProfilingStatsView.as_view(), name='profiling'),
 ]
@@ -1,61 +1,144 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.conf import settings
+from django.db.models import F, OuterRef, Prefetch, Subquery
+from django.http import StreamingHttpResponse
 
-from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import mixins, viewsets
+from djoser.views import UserViewSet as DjoserUserViewSet
+from rest_framework import viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated
+from rest_framework.permissions import (SAFE_METHODS, AllowAny, IsAdminUser,
+                                        IsAuthenticated)
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from .filters import IngredientFilter
-from .mixins import AddRemoveListMixin
+from foodgram.pagination import RecipePagination
+from foodgram.profiling import get_stats
+
+from .mixins import (AddRemoveListMixin, CatalogueListRetrieveMixin,
+                     ConditionalListRetrieveMixin, QueryBudgetMixin,
+                     SharedCacheListRetrieveMixin)
 from .permissions import AllowAuthorOrReadOnly
+from .renderers import SHOPPING_LIST_RENDERERS
 from .serializers import (IngredientSerializer, RecipeCreateUpdateSerializer,
-                          RecipeSerializer, SubscriptionListSerializer,
+                          RecipeFeedSerializer, SubscriptionListSerializer,
                           TagSerializer)
-from recipes.models import (FavoriteRecipes, Ingredient, Recipe, ShoppingCarts,
-                            Tag, User)
+from recipes.catalogue import get_catalogue, get_ingredient
+from recipes.models import (FavoriteRecipes, Ingredient, Recipe,
+                            ShoppingCartIngredient, ShoppingCarts, Tag, User)
+from recipes.user_lists import get_user_lists
+from recipes.versions import (CATALOGUE_VERSION_KEY, FEED_VERSION_KEY,
+                              RECIPES_VERSION_KEY)
 from users.models import Subscription
 
 
-class IngredientViewSet(mixins.ListModelMixin,
-                        mixins.RetrieveModelMixin,
+class IngredientViewSet(QueryBudgetMixin,
+                        ConditionalListRetrieveMixin,
+                        CatalogueListRetrieveMixin,
                         viewsets.GenericViewSet):
-    """Возвращает имеющиеся в базе ингредиенты."""
+    """Возвращает имеющиеся в базе ингредиенты.
+
+    Данные отдаются из справочника в памяти процесса, поиск по параметру
+    name возвращает сначала совпадения по началу названия.
+    """
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
-    filter_backends = (DjangoFilterBackend,)
-    filterset_class = IngredientFilter
     pagination_class = None
     permission_classes = (AllowAny,)
+    version_key = CATALOGUE_VERSION_KEY
+    # Токен, перечитывание справочника после его изменения и запрос
+    # по ключу при промахе retrieve по снимку.
+    max_queries = 4
+
+    def get_catalogue_list(self, catalogue):
+        name = self.request.query_params.get('name')
+        if name:
+            return catalogue.search_ingredients(
+                name, settings.INGREDIENT_SEARCH_LIMIT)
+        return catalogue.ingredients
+
+    def get_catalogue_item(self, catalogue, pk):
+        return get_ingredient(pk)
 
 
-class TagViewSet(mixins.ListModelMixin,
-                 mixins.RetrieveModelMixin,
+class TagViewSet(QueryBudgetMixin,
+                 ConditionalListRetrieveMixin,
+                 CatalogueListRetrieveMixin,
                  viewsets.GenericViewSet):
-    """Возвращает имеющиеся в базе теги."""
+    """Возвращает имеющиеся в базе теги из справочника в памяти."""
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
     permission_classes = (AllowAny,)
+    version_key = CATALOGUE_VERSION_KEY
+    max_queries = 3
 
+    def get_catalogue_list(self, catalogue):
+        return catalogue.tags
 
-class RecipeViewSet(viewsets.ModelViewSet, AddRemoveListMixin):
+    def get_catalogue_item(self, catalogue, pk):
+        return catalogue.tags_by_id.get(pk)
+
+
+class RecipeViewSet(QueryBudgetMixin,
+                    ConditionalListRetrieveMixin,
+                    SharedCacheListRetrieveMixin,
+                    viewsets.ModelViewSet,
+                    AddRemoveListMixin):
     """Обрабатывает запоросы по работе с рецептами GET, POST, PATCH, DELETE."""
     http_method_names = ('get', 'post', 'patch', 'delete')
     permission_classes = (AllowAuthorOrReadOnly,)
+    version_key = FEED_VERSION_KEY
+    user_dependent = True
+    cache_version_key = RECIPES_VERSION_KEY
+    pagination_class = RecipePagination
+    # Не зависит от длины страницы: авторы, теги и ингредиенты
+    # загружаются по одному запросу на страницу. На пустом кэше сюда
+    # входят токен, перечитывание справочника и списки пользователя.
+    max_queries = {'list': 9, 'retrieve': 8}
 
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
-            return RecipeSerializer
+            return RecipeFeedSerializer
         return RecipeCreateUpdateSerializer
 
+    def is_shared_request(self, request):
+        params = request.query_params
+        return request.user.is_anonymous or not (
+            params.get('is_favorited') or params.get('is_in_shopping_cart')
+        )
+
+    @staticmethod
+    def get_recipes_data(data):
+        return data['results'] if 'results' in data else [data]
+
+    def depersonalize(self, data):
+        return self.personalize(data, None)
+
+    def personalize(self, data, user):
+        user_lists = get_user_lists(user and user.pk)
+        for recipe in self.get_recipes_data(data):
+            recipe['is_favorited'] = recipe['id'] in user_lists.favorited
+            recipe['is_in_shopping_cart'] = (
+                recipe['id'] in user_lists.in_cart)
+            recipe['author']['is_subscribed'] = (
+                recipe['author']['id'] in user_lists.subscribed)
+        return data
+
     def get_queryset(self):
         tags = self.request.query_params.getlist('tags')
         user = self.request.user
         queryset = Recipe.objects
         if tags:
-            queryset = queryset.filtered_by_tags(tags)
+            tag_ids = get_catalogue().tag_ids(tags)
+            if not tag_ids:
+                return queryset.none()
+            queryset = queryset.filtered_by_tags(tag_ids)
         queryset = queryset.add_user_annotations(user.pk)
+        # Чтение идет через строки .values() и RecipeFeedSerializer,
+        # изменению нужны экземпляры модели со связями.
+        if self.request.method in SAFE_METHODS:
+            queryset = queryset.values(*RecipeFeedSerializer.values_fields)
+        else:
+            queryset = queryset.with_related(user.pk)
         if self.request.query_params.get('is_favorited'):
             queryset = queryset.filter(is_favorited=True)
         if self.request.query_params.get('is_in_shopping_cart'):
@@ -63,6 +146,9 @@ class RecipeViewSet(viewsets.ModelViewSet, AddRemoveListMixin):
         author = self.request.query_params.get('author', None)
         if author:
             queryset = queryset.filter(author=author)
+        if self.request.query_params.get('ordering') == 'popular':
+            queryset = queryset.order_by(
+                '-favorites_count', '-create_date', '-id')
         return queryset
 
     @action(
@@ -93,37 +179,71 @@ class RecipeViewSet(viewsets.ModelViewSet, AddRemoveListMixin):
         methods=['GET'],
         detail=False,
         url_path=r'download_shopping_cart',
-        url_name='download_shopping_cart')
+        url_name='download_shopping_cart',
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=SHOPPING_LIST_RENDERERS)
     def download_shopping_cart(self, request):
-        """Возвращает список покупок рецептам в корзине пользователя."""
+        """Возвращает список покупок рецептам в корзине пользователя.
+
+        Формат файла выбирается параметром `format` (txt, csv) или
+        заголовком Accept, файл отдается потоком по мере чтения из БД.
+        """
         queryset = (
-            Ingredient.objects
-            .prefetch_related('ingredient_in_recipes__recipe__recipe_carts')
-            .filter(
-                ingredient_in_recipes__recipe__recipe_carts__user=request.user)
-            .annotate(amount=Sum('ingredient_in_recipes__amount'))
-            .values('name', 'measurement_unit', 'amount')
-            .order_by('name')
+            ShoppingCartIngredient.objects
+            .filter(user=request.user)
+            .values('amount',
+                    name=F('ingredient__name'),
+                    measurement_unit=F('ingredient__measurement_unit'))
+            .order_by('ingredient__name')
+        )
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(queryset.iterator(chunk_size=2000)),
+            content_type=f'{renderer.media_type}; '
+                         f'charset={renderer.charset}'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{renderer.get_filename()}"'
         )
-        response = HttpResponse(content_type='text/plain')
-        for data in queryset:
-            response.write(
-                f'''{data['name']} - {data['amount']} '''
-                f'''{data['measurement_unit']}\n'''
-            )
-        response['Content-Disposition'] = ('attachment; '
-                                           'filename="shopping-list.txt"')
         return response
 
 
-class SubscriptionViewSet(viewsets.ModelViewSet, AddRemoveListMixin):
+class SubscriptionViewSet(QueryBudgetMixin,
+                          viewsets.ModelViewSet,
+                          AddRemoveListMixin):
     """Возвращает список текщих подпискок пользователя."""
     serializer_class = SubscriptionListSerializer
     http_method_names = ('get',)
     permission_classes = (IsAuthenticated,)
+    max_queries = {'list': 5}
 
     def get_queryset(self):
-        return User.objects.filter(subscribers__user=self.request.user)
+        user = self.request.user
+        recipes = Recipe.objects.all()
+        recipes_limit = self.request.query_params.get('recipes_limit')
+        if recipes_limit and recipes_limit.isdigit():
+            recipes = recipes.filter(pk__in=Subquery(
+                Recipe.objects
+                .filter(author=OuterRef('author'))
+                .values('pk')[:int(recipes_limit)]
+            ))
+        return (
+            User.objects
+            .filter(subscribers__user=user)
+            .add_subscription_annotation(user.pk)
+            .prefetch_related(Prefetch('user_recipes', queryset=recipes))
+            .order_by('email')
+        )
+
+
+class UserViewSet(DjoserUserViewSet):
+    """Пользователи djoser с признаком подписки, вычисленным в запросе."""
+
+    def get_queryset(self):
+        return (
+            super().get_queryset()
+            .add_subscription_annotation(self.request.user.pk)
+        )
 
 
 class SubscriptionActionViewSet(viewsets.ViewSet, AddRemoveListMixin):
@@ -148,3 +268,14 @@ class SubscriptionActionViewSet(viewsets.ViewSet, AddRemoveListMixin):
             field_name='author',
             target_model=Subscription,
         )
+
+
+class ProfilingStatsView(APIView):
+    """Перцентили времени ответа и число запросов к БД по эндпоинтам.
+
+    Данные собирает ProfilingMiddleware в памяти текущего процесса.
+    """
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(get_stats())
@@ -0,0 +1,88 @@
+"""ASGI-обработчик, выполняющий запросы в пуле потоков.
+
+DRF 3.14 не поддерживает async-представления, а асинхронный ORM Django 4.1
+выполняет запросы через sync_to_async в одном общем потоке процесса. В нем
+же стандартный ASGIHandler запускает синхронные представления и каждый
+синхронный middleware, так что воркер обрабатывал бы запросы по одному.
+
+ThreadPoolASGIHandler читает тело запроса и отправляет ответ в цикле
+событий, а всю синхронную цепочку middleware и представлений выполняет
+в пуле из ASGI_THREADS потоков, одним переходом на запрос. Потоковые
+ответы читаются в пуле по частям. У каждого
+потока свое соединение с БД; при CONN_MAX_AGE > 0 соединения переживают
+запросы и образуют пул: воркер открывает не больше ASGI_THREADS соединений.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.db import close_old_connections
+
+_lock = threading.Lock()
+_executor = None
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ASGI_THREADS,
+                thread_name_prefix='asgi'
+            )
+        return _executor
+
+
+def _call_with_connections(func, *args):
+    # Сигналы начала и конца запроса закрывают соединения только в общем
+    # потоке, поэтому потоки пула проверяют свои соединения сами.
+    close_old_connections()
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+class ThreadPoolASGIHandler(ASGIHandler):
+
+    def load_middleware(self, is_async=False):
+        super().load_middleware(is_async=False)
+
+    async def run_in_pool(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(
+            get_executor(), _call_with_connections, func, *args)
+
+    async def get_response_async(self, request):
+        return await self.run_in_pool(self.get_response, request)
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+        # Django 4.1 перебирает потоковый ответ прямо в цикле событий,
+        # где запросы к БД запрещены. Части тела читаются в пуле по одной
+        # и сразу отправляются, не накапливаясь в памяти.
+        headers = [
+            (header.encode('ascii'), value.encode('latin1'))
+            for header, value in response.items()
+        ]
+        headers.extend(
+            (b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+            for cookie in response.cookies.values()
+        )
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': headers,
+        })
+        parts = iter(response)
+        while (part := await self.run_in_pool(next, parts, None)) is not None:
+            for chunk, _ in self.chunk_bytes(part):
+                await send({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                })
+        await send({'type': 'http.response.body'})
+        await self.run_in_pool(response.close)
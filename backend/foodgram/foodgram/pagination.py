@@ -1,6 +1,179 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (Cursor, CursorPagination,
+                                       PageNumberPagination)
+from rest_framework.response import Response
 
 
 class CustomLimitPagination(PageNumberPagination):
     page_size = 1000
     page_size_query_param = 'limit'
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Курсорная пагинация ленты рецептов по (create_date, id)
+    или по явно заданной в queryset сортировке.
+
+    Курсор DRF хранит значение только первого поля сортировки, а равные
+    значения пропускает через OFFSET. Здесь курсор хранит значения всех
+    полей, и страница выбирается условием по кортежу (keyset), поэтому
+    стоимость страницы не зависит от ее номера при любой сортировке.
+    Общее количество рецептов считается только по запросу с параметром
+    count=true.
+    """
+    ordering = ('-create_date', '-id')
+    page_size = 20
+    page_size_query_param = 'limit'
+    max_page_size = 1000
+    count_query_param = 'count'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = self.ordering
+        if queryset.query.order_by:
+            ordering = tuple(queryset.query.order_by)
+        if ordering[-1].lstrip('-') not in ('id', 'pk'):
+            # id делает позицию уникальной.
+            ordering += ('-id' if ordering[-1].startswith('-') else 'id',)
+        return ordering
+
+    def decode_cursor(self, request):
+        cursor = super().decode_cursor(request)
+        if cursor is None or cursor.position is None:
+            return cursor
+        try:
+            position = json.loads(cursor.position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if (not isinstance(position, list)
+                or len(position) != len(self.ordering)):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor._replace(position=position)
+
+    def encode_cursor(self, cursor):
+        if cursor.position is not None:
+            cursor = cursor._replace(position=json.dumps(cursor.position))
+        return super().encode_cursor(cursor)
+
+    def _get_position_from_instance(self, instance, ordering):
+        return [
+            str(instance[field] if isinstance(instance, dict)
+                else getattr(instance, field))
+            for field in (order.lstrip('-') for order in ordering)
+        ]
+
+    @staticmethod
+    def get_keyset_filter(ordering, position):
+        """Условие "после позиции" для сортировки ordering.
+
+        Первое поле дополнительно ограничено нестрогим неравенством,
+        чтобы БД искала по индексу диапазоном.
+        """
+        lookups = [
+            (order.lstrip('-'), 'lt' if order.startswith('-') else 'gt')
+            for order in ordering
+        ]
+        after = Q()
+        for index, (field, lookup) in enumerate(lookups):
+            equal = {name: value for (name, _), value
+                     in zip(lookups[:index], position)}
+            after |= Q(**equal, **{f'{field}__{lookup}': position[index]})
+        field, lookup = lookups[0]
+        return Q(**{f'{field}__{lookup}e': position[0]}) & after
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get(self.count_query_param) == 'true':
+            self.count = queryset.count()
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse, position = False, None
+        if self.cursor is not None:
+            reverse, position = self.cursor.reverse, self.cursor.position
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(
+                order[1:] if order.startswith('-') else f'-{order}'
+                for order in ordering
+            )
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(
+                    self.get_keyset_filter(ordering, position))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = (
+                position is not None, has_following)
+        else:
+            self.has_next, self.has_previous = (
+                has_following, position is not None)
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        # Пустая страница назад означает, что перед позицией ничего нет,
+        # и следующей будет первая страница.
+        position = None
+        if self.page:
+            position = self._get_position_from_instance(
+                self.page[-1], self.ordering)
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = None
+        if self.page:
+            position = self._get_position_from_instance(
+                self.page[0], self.ordering)
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=True, position=position))
+
+    def get_paginated_response(self, data):
+        content = OrderedDict()
+        if self.count is not None:
+            content['count'] = self.count
+        content['next'] = self.get_next_link()
+        content['previous'] = self.get_previous_link()
+        content['results'] = data
+        return Response(content)
+
+
+class RecipePagination(CustomLimitPagination):
+    """Пагинация ленты рецептов.
+
+    По умолчанию постраничная, как ожидает фронтенд (page и limit).
+    При наличии параметра cursor, в том числе пустого для первой
+    страницы, используется курсорная RecipeCursorPagination.
+    """
+    cursor_pagination_class = RecipeCursorPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        cursor_query_param = self.cursor_pagination_class.cursor_query_param
+        if cursor_query_param in request.query_params:
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,165 @@
+"""Профилирование запросов без внешних сервисов.
+
+ProfilingMiddleware считает для каждого запроса число SQL-запросов, время
+в БД, время представления без БД (сериализаторы и код view), время
+рендеринга ответа и общее время. Результат отдается в заголовке
+Server-Timing и копится по эндпоинтам в памяти процесса; сводку с
+перцентилями возвращает get_stats(). Запросы с признаками N+1 (один и тот
+же SQL много раз) и с повторами одинаковых запросов пишутся в лог.
+"""
+import logging
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_samples = defaultdict(lambda: deque(maxlen=settings.PROFILING_WINDOW))
+
+
+class QueryCounter:
+    """Обертка выполнения SQL, считающая запросы."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class RequestProfile:
+    """Замеры одного запроса; служит оберткой выполнения SQL."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = self.view_finished = self.finished = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = Counter()
+        self.executions = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+            self.statements[sql] += 1
+            self.executions[sql, repr(params)] += 1
+
+    def finish(self):
+        self.finished = time.perf_counter()
+        if self.view_started is None:
+            self.view_started = self.started
+        if self.view_finished is None:
+            self.view_finished = self.finished
+
+    @property
+    def timings(self):
+        """Длительности этапов в миллисекундах."""
+        view = self.view_finished - self.view_started
+        return {
+            'db': self.db_time * 1000,
+            'app': max(view - self.db_time, 0) * 1000,
+            'render': (self.finished - self.view_finished) * 1000,
+            'total': (self.finished - self.started) * 1000,
+        }
+
+    def server_timing(self):
+        timings = self.timings
+        return ', '.join((
+            f'db;dur={timings["db"]:.1f};desc="{self.queries} queries"',
+            f'app;dur={timings["app"]:.1f}',
+            f'render;dur={timings["render"]:.1f}',
+            f'total;dur={timings["total"]:.1f}',
+        ))
+
+    def repeated_statements(self):
+        threshold = settings.PROFILING_N_PLUS_ONE_THRESHOLD
+        return [
+            (sql, count) for sql, count in self.statements.items()
+            if count >= threshold
+        ]
+
+    def duplicate_executions(self):
+        threshold = settings.PROFILING_N_PLUS_ONE_THRESHOLD
+        return [
+            (sql, count) for (sql, _), count in self.executions.items()
+            if count > 1 and self.statements[sql] < threshold
+        ]
+
+
+def _percentile(values, percent):
+    return values[min(int(len(values) * percent / 100), len(values) - 1)]
+
+
+def get_stats():
+    """Сводка по эндпоинтам за последние PROFILING_WINDOW запросов."""
+    with _lock:
+        samples = {key: list(values) for key, values in _samples.items()}
+    stats = []
+    for endpoint, values in sorted(samples.items()):
+        totals, db_times, queries = zip(*values)
+        totals = sorted(totals)
+        stats.append({
+            'endpoint': endpoint,
+            'count': len(values),
+            'p50_ms': round(_percentile(totals, 50), 1),
+            'p95_ms': round(_percentile(totals, 95), 1),
+            'p99_ms': round(_percentile(totals, 99), 1),
+            'avg_db_ms': round(sum(db_times) / len(values), 1),
+            'avg_queries': round(sum(queries) / len(values), 1),
+        })
+    return stats
+
+
+class ProfilingMiddleware:
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        request.profile = profile
+        with connection.execute_wrapper(profile):
+            response = self.get_response(request)
+        profile.finish()
+        response['Server-Timing'] = profile.server_timing()
+        self.record(request, profile)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.profile.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # Ответы DRF рендерятся после выхода из view.
+        request.profile.view_finished = time.perf_counter()
+        return response
+
+    @staticmethod
+    def record(request, profile):
+        match = request.resolver_match
+        if match is None:
+            return
+        endpoint = f'{request.method} {match.view_name}'
+        timings = profile.timings
+        with _lock:
+            _samples[endpoint].append(
+                (timings['total'], timings['db'], profile.queries))
+        for sql, count in profile.repeated_statements():
+            logger.warning(
+                'Возможен N+1 в %s: запрос выполнен %s раз: %s',
+                endpoint, count, sql)
+        for sql, count in profile.duplicate_executions():
+            logger.warning(
+                'Повторный запрос в %s: выполнен %s раз с теми же '
+                'параметрами: %s', endpoint, count, sql)
@@ -52,6 +52,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'foodgram.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -90,12 +91,25 @@ DATABASES = {
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
         'PORT': os.getenv('DB_PORT'),
+        # Под ASGI соединения потоков пула живут между запросами.
+        'CONN_MAX_AGE': int(os.getenv('CONN_MAX_AGE', 0)),
+        'CONN_HEALTH_CHECKS': True,
         'TEST': {
             'NAME': 'mytestdatabase',
         },
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': (os.getenv('CACHE_BACKEND')
+                    or 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+RESPONSE_CACHE_TIMEOUT = 300
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -140,7 +154,38 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS':
         'foodgram.pagination.CustomLimitPagination',
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+INGREDIENT_SEARCH_LIMIT = 50
+
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'True') == 'True'
+PROFILING_WINDOW = 1000
+PROFILING_N_PLUS_ONE_THRESHOLD = 5
+
+QUERY_BUDGET_STRICT = os.getenv('QUERY_BUDGET_STRICT', str(DEBUG)) == 'True'
+
+# Потоков на воркер ASGI, см. foodgram.asgi_handler.
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', 8))
+
+CATALOGUE_VERSION_CHECK_INTERVAL = 1
+
+IMAGE_ALLOWED_TYPES = ('jpeg', 'png', 'gif', 'webp')
+IMAGE_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+IMAGE_MAX_SIZE = (6000, 6000)
+IMAGE_MAX_PIXELS = 24_000_000
+IMAGE_RENDITIONS = {
+    'thumbnail': (400, 400),
+    'medium': (1200, 1200),
 }
+IMAGE_WEBP_QUALITY = 80
+# Качество JPEG, который приходится пережимать после поворота по EXIF.
+IMAGE_JPEG_QUALITY = 95
+IMAGE_PROCESSING_WORKERS = 2
+IMAGE_PROCESSING_ASYNC = True
 
 DJOSER = {
     'LOGIN_FIELD': 'email',
@@ -157,6 +202,6 @@ sentry_sdk.init(
     integrations=[
         DjangoIntegration(),
     ],
-    traces_sample_rate=1.0,
+    traces_sample_rate=float(os.getenv('SENTRY_TRACES_SAMPLE_RATE', 0.05)),
     send_default_pii=True
 )
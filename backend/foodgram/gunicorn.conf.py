@@ -0,0 +1,31 @@
+"""Настройки gunicorn.
+
+SERVER_MODE=wsgi (по умолчанию) запускает синхронные воркеры,
+SERVER_MODE=asgi - воркеры uvicorn, в которых запросы выполняются в пуле
+из ASGI_THREADS потоков (foodgram.asgi_handler).
+
+Несколько воркеров (GUNICORN_WORKERS > 1) требуют общего кэша
+(CACHE_BACKEND): версии данных и ETag хранятся в кэше, и с кэшем в памяти
+процесса воркеры отдают устаревшие ответы.
+"""
+import os
+
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
+
+bind = '0:8000'
+workers = int(os.getenv('GUNICORN_WORKERS', 1))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', '')
+if workers > 1 and (not CACHE_BACKEND
+                    or CACHE_BACKEND.endswith(('LocMemCache', 'DummyCache'))):
+    raise RuntimeError(
+        'GUNICORN_WORKERS > 1 требует общего кэша: задайте CACHE_BACKEND и '
+        'CACHE_LOCATION (например, Redis)')
+
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'foodgram.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'foodgram.wsgi:application'
+    threads = int(os.getenv('GUNICORN_THREADS', 1))
@@ -35,7 +35,8 @@ class IngredientToRecipeInline(admin.TabularInline):
 
 
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'author')
+    list_display = ('id', 'name', 'author', 'favorites_count')
+    readonly_fields = ('favorites_count', 'cart_count')
     list_display_links = ('id', 'name')
     search_fields = ('name', )
     actions_selection_counter = True
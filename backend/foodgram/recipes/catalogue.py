@@ -0,0 +1,183 @@
+"""Неизменяемый кэш справочников тегов и ингредиентов в памяти процесса.
+
+Теги и ингредиенты меняются только через админку или загрузку начальных
+данных, поэтому каждый процесс держит их копию в памяти. Актуальность
+копии определяется версией в общем кэше Django: при изменении справочника
+сигналы записывают новую версию, и процессы перечитывают данные при
+следующем обращении (не чаще раза в CATALOGUE_VERSION_CHECK_INTERVAL
+секунд).
+"""
+import bisect
+import threading
+import time
+
+from django.conf import settings
+
+from .models import Ingredient, Tag
+from .versions import CATALOGUE_VERSION_KEY, bump_version, get_version
+
+
+class Catalogue:
+    """Снимок справочников, собранный под конкретную версию."""
+
+    def __init__(self, version):
+        self.version = version
+        self.tags = tuple(
+            Tag.objects.values('id', 'name', 'color', 'slug')
+        )
+        self.tags_by_id = {tag['id']: tag for tag in self.tags}
+        self.tags_by_slug = {tag['slug']: tag for tag in self.tags}
+        self.ingredients = tuple(
+            Ingredient.objects.values('id', 'name', 'measurement_unit')
+        )
+        self.ingredients_by_id = {
+            ingredient['id']: ingredient for ingredient in self.ingredients
+        }
+        # Позиции в порядке сортировки БД (с ее правилами сравнения строк),
+        # чтобы упорядочивать теги и ингредиенты рецепта как в запросах.
+        self.tag_positions = {
+            tag['id']: position for position, tag in enumerate(self.tags)
+        }
+        self.ingredient_positions = {
+            ingredient['id']: position
+            for position, ingredient in enumerate(self.ingredients)
+        }
+        self._upper_names = [
+            ingredient['name'].upper() for ingredient in self.ingredients
+        ]
+        # Отсортированный массив (название, позиция) для поиска по префиксу
+        # двоичным поиском; позиция сохраняет порядок сортировки БД.
+        self._prefix_index = sorted(
+            (name, position)
+            for position, name in enumerate(self._upper_names)
+        )
+
+    def tag_ids(self, slugs):
+        """Id тегов по слагам, неизвестные слаги пропускаются."""
+        return [
+            self.tags_by_slug[slug]['id']
+            for slug in slugs if slug in self.tags_by_slug
+        ]
+
+    def search_ingredients(self, query, limit):
+        """Ингредиенты, начинающиеся с query, затем содержащие его."""
+        query = query.upper()
+        start = bisect.bisect_left(self._prefix_index, (query,))
+        prefixed = []
+        for name, position in self._prefix_index[start:]:
+            if not name.startswith(query):
+                break
+            prefixed.append(position)
+        prefixed.sort()
+        result = [self.ingredients[position] for position in prefixed]
+        if len(result) < limit:
+            prefixed = set(prefixed)
+            result.extend(
+                self.ingredients[position]
+                for position, name in enumerate(self._upper_names)
+                if query in name and position not in prefixed
+            )
+        return result[:limit]
+
+
+_lock = threading.Lock()
+_catalogue = None
+_checked_at = 0.0
+
+
+def get_catalogue(force=False):
+    """Возвращает актуальный снимок справочников процесса."""
+    global _catalogue, _checked_at
+    now = time.monotonic()
+    if (not force and _catalogue is not None
+            and now - _checked_at < settings.CATALOGUE_VERSION_CHECK_INTERVAL):
+        return _catalogue
+    with _lock:
+        version = get_version(CATALOGUE_VERSION_KEY)
+        if force or _catalogue is None or _catalogue.version != version:
+            _catalogue = Catalogue(version)
+        _checked_at = now
+        return _catalogue
+
+
+def get_ingredient(ingredient_id):
+    """Ингредиент по id; отсутствующий в снимке ищется запросом по ключу.
+
+    Промах не перечитывает снимок: иначе запросы несуществующих id
+    перечитывали бы весь справочник. Снимок обновляется только по версии.
+    """
+    ingredient = get_catalogue().ingredients_by_id.get(ingredient_id)
+    if ingredient is None:
+        ingredient = (
+            Ingredient.objects
+            .filter(pk=ingredient_id)
+            .values('id', 'name', 'measurement_unit')
+            .first()
+        )
+    return ingredient
+
+
+POSITION_MODELS = {
+    'tag_positions': Tag,
+    'ingredient_positions': Ingredient,
+}
+
+
+def get_positions(attribute, ids):
+    """Позиции tag_positions или ingredient_positions снимка.
+
+    Отсутствующие в снимке id ставятся после известных в порядке
+    сортировки БД, одним запросом по ключам.
+    """
+    positions = getattr(get_catalogue(), attribute)
+    missing = set(ids) - positions.keys()
+    if missing:
+        positions = dict(positions)
+        positions.update(
+            (pk, position)
+            for position, pk in enumerate(
+                POSITION_MODELS[attribute].objects
+                .filter(pk__in=missing)
+                .values_list('id', flat=True),
+                start=len(positions)
+            )
+        )
+    return positions
+
+
+def _in_bulk(by_id, queryset, ids):
+    found = {pk: by_id[pk] for pk in ids if pk in by_id}
+    missing = set(ids) - found.keys()
+    if missing:
+        found.update(
+            (item['id'], item) for item in queryset.filter(pk__in=missing))
+    return found
+
+
+def get_tags(tag_ids):
+    """Теги по списку id; отсутствующие в снимке ищутся одним запросом."""
+    return _in_bulk(
+        get_catalogue().tags_by_id,
+        Tag.objects.values('id', 'name', 'color', 'slug'),
+        tag_ids
+    )
+
+
+def get_ingredients(ingredient_ids):
+    """Ингредиенты по списку id; отсутствующие в снимке ищутся одним
+    запросом."""
+    return _in_bulk(
+        get_catalogue().ingredients_by_id,
+        Ingredient.objects.values('id', 'name', 'measurement_unit'),
+        ingredient_ids
+    )
+
+
+def _drop_local_catalogue():
+    global _catalogue
+    _catalogue = None
+
+
+def invalidate_catalogue():
+    """Объявляет снимки справочников во всех процессах устаревшими."""
+    bump_version(CATALOGUE_VERSION_KEY, _drop_local_catalogue)
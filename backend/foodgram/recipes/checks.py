@@ -0,0 +1,17 @@
+"""Проверки настроек приложения recipes (manage.py check --deploy)."""
+from django.core.checks import Tags, Warning, register
+
+from .versions import LOCAL_CACHE_WARNING, is_shared_cache
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    if is_shared_cache():
+        return []
+    return [Warning(
+        LOCAL_CACHE_WARNING,
+        hint='Например, CACHE_BACKEND='
+             'django.core.cache.backends.redis.RedisCache и '
+             'CACHE_LOCATION=redis://redis:6379/1.',
+        id='recipes.W001',
+    )]
@@ -0,0 +1,47 @@
+"""Денормализованные счетчики рецептов и пользователей.
+
+Счетчики меняются атомарно выражениями F() при добавлении и удалении
+связанных записей (см. signals) и могут быть пересчитаны целиком
+командой reconcile_counters.
+"""
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+# (модель-источник, модель со счетчиком, поле связи, поле счетчика)
+COUNTERS = (
+    (('recipes', 'FavoriteRecipes'), ('recipes', 'Recipe'),
+     'recipe', 'favorites_count'),
+    (('recipes', 'ShoppingCarts'), ('recipes', 'Recipe'),
+     'recipe', 'cart_count'),
+    (('recipes', 'Recipe'), ('users', 'User'),
+     'author', 'recipes_count'),
+    (('users', 'Subscription'), ('users', 'User'),
+     'author', 'subscribers_count'),
+)
+
+
+def change_counter(model, pk, field, delta):
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def reconcile_counters(apps=global_apps):
+    """Пересчитывает все счетчики по исходным таблицам."""
+    with transaction.atomic():
+        for source, target, relation, field in COUNTERS:
+            source_model = apps.get_model(*source)
+            totals = (
+                source_model.objects
+                .filter(**{relation: OuterRef('pk')})
+                .order_by()
+                .values(relation)
+                .annotate(total=Count('pk'))
+                .values('total')
+            )
+            apps.get_model(*target).objects.update(
+                **{field: Coalesce(Subquery(totals), Value(0))}
+            )
@@ -0,0 +1,126 @@
+"""Обработка изображений рецептов вне потока запроса.
+
+После сохранения рецепта с новой картинкой задача ставится в локальный
+пул потоков: из оригинала удаляются метаданные (EXIF и пр.) с учетом
+ориентации, и строятся уменьшенные копии в формате WebP из
+settings.IMAGE_RENDITIONS. Очищенный оригинал сохраняется под новым хешем
+содержимого, а копии называются по нему же, поэтому одинаковые картинки
+обрабатываются и хранятся один раз.
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+
+from PIL import ExifTags, Image, ImageOps, JpegImagePlugin
+
+from .models import Recipe
+from .storage import touch
+from .versions import FEED_VERSION_KEY, RECIPES_VERSION_KEY, bump_version
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS_DIR = 'recipes/renditions/'
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_PROCESSING_WORKERS,
+    thread_name_prefix='recipe-images'
+)
+
+
+def rendition_name(image_name, rendition):
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    return f'{RENDITIONS_DIR}{stem}_{rendition}.webp'
+
+
+def needs_processing(recipe):
+    return bool(recipe.image) and (
+        recipe.image_thumbnail.name
+        != rendition_name(recipe.image.name, 'thumbnail')
+    )
+
+
+def _encode(image, format, **options):
+    buffer = BytesIO()
+    image.save(buffer, format=format, **options)
+    return buffer.getvalue()
+
+
+def _clean_original(image):
+    """Поворачивает оригинал по EXIF и кодирует его без метаданных.
+
+    Pillow не записывает метаданные, если их не передать явно. JPEG без
+    поворота пережимается с исходными таблицами квантования, у GIF
+    сохраняются все кадры анимации. Снимки MPO (так Pillow открывает
+    многие фотографии с телефонов) сохраняются как JPEG из первого кадра.
+    """
+    image_format = 'JPEG' if image.format == 'MPO' else image.format
+    options = {}
+    if 'icc_profile' in image.info:
+        options['icc_profile'] = image.info['icc_profile']
+    orientation = image.getexif().get(ExifTags.Base.Orientation, 1)
+    if orientation != 1:
+        image = ImageOps.exif_transpose(image)
+        if image_format == 'JPEG':
+            options['quality'] = settings.IMAGE_JPEG_QUALITY
+    elif image_format == 'JPEG':
+        # То же, что quality='keep', который Pillow принимает только
+        # для формата JPEG.
+        options['qtables'] = image.quantization
+        options['subsampling'] = JpegImagePlugin.get_sampling(image)
+    elif getattr(image, 'is_animated', False):
+        options['save_all'] = True
+    return image, _encode(image, image_format, **options)
+
+
+def process_recipe_image(recipe_id):
+    recipe = Recipe.objects.filter(pk=recipe_id).first()
+    if recipe is None or not needs_processing(recipe):
+        return
+    storage = recipe.image.storage
+    image_name = recipe.image.name
+    with storage.open(image_name, 'rb') as image_file:
+        image, content = _clean_original(Image.open(image_file))
+        # Уменьшенные копии строятся по первому кадру, пока файл открыт.
+        image.seek(0)
+        image = image.convert(
+            image.mode if image.mode in ('RGB', 'RGBA') else 'RGBA')
+    clean_name = storage.save(image_name, ContentFile(content))
+    renditions = {}
+    for rendition, size in settings.IMAGE_RENDITIONS.items():
+        name = rendition_name(clean_name, rendition)
+        rendition_storage = getattr(recipe, f'image_{rendition}').storage
+        if not touch(rendition_storage, name):
+            copy = image.copy()
+            copy.thumbnail(size)
+            name = rendition_storage.save(name, ContentFile(
+                _encode(copy, 'WEBP', quality=settings.IMAGE_WEBP_QUALITY)))
+        renditions[f'image_{rendition}'] = name
+    updated = Recipe.objects.filter(
+        pk=recipe_id, image=image_name
+    ).update(image=clean_name, **renditions)
+    if updated:
+        bump_version(RECIPES_VERSION_KEY)
+        bump_version(FEED_VERSION_KEY)
+
+
+def _run(recipe_id):
+    try:
+        process_recipe_image(recipe_id)
+    except Exception:
+        logger.exception('Ошибка обработки изображения рецепта %s',
+                         recipe_id)
+    finally:
+        connection.close()
+
+
+def schedule_image_processing(recipe_id):
+    """Ставит обработку картинки в очередь после фиксации транзакции."""
+    if settings.IMAGE_PROCESSING_ASYNC:
+        transaction.on_commit(lambda: _executor.submit(_run, recipe_id))
+    else:
+        transaction.on_commit(lambda: process_recipe_image(recipe_id))
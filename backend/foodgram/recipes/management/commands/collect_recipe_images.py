@@ -0,0 +1,58 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from recipes.images import RENDITIONS_DIR
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = ('Удаляет файлы картинок рецептов и их уменьшенных копий, '
+            'на которые не ссылается ни один рецепт')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age', type=int, default=3600,
+            help='Не трогать файлы моложе указанного числа секунд')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать файлы, которые будут удалены')
+
+    @staticmethod
+    def is_referenced(name):
+        return Recipe.objects.filter(
+            Q(image=name) | Q(image_thumbnail=name) | Q(image_medium=name)
+        ).exists()
+
+    def handle(self, *args, **options):
+        field = Recipe._meta.get_field('image')
+        used = set()
+        for names in Recipe.objects.values_list(
+                'image', 'image_thumbnail', 'image_medium').iterator():
+            used.update(names)
+        deadline = time.time() - options['min_age']
+        removed = 0
+        for directory, storage in (
+                (field.upload_to, field.storage),
+                (RENDITIONS_DIR,
+                 Recipe._meta.get_field('image_thumbnail').storage)):
+            if not storage.exists(directory):
+                continue
+            for filename in storage.listdir(directory)[1]:
+                name = os.path.join(directory, filename)
+                # Набор used собран до обхода каталога: ссылку проверяем
+                # заново, а время изменения последним, так как повторная
+                # загрузка того же файла обновляет его до записи ссылки.
+                if name in used or self.is_referenced(name) or (
+                        storage.get_modified_time(name).timestamp()
+                        > deadline):
+                    continue
+                if not options['dry_run']:
+                    storage.delete(name)
+                self.stdout.write(name)
+                removed += 1
+        message = ('Неиспользуемых файлов' if options['dry_run']
+                   else 'Удалено файлов')
+        self.stdout.write(self.style.SUCCESS(f'{message}: {removed}'))
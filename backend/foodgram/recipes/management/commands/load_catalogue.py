@@ -0,0 +1,121 @@
+import csv
+import json
+import os
+import re
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.catalogue import invalidate_catalogue
+from recipes.models import Ingredient, Tag
+from recipes.versions import (FEED_VERSION_KEY, LOCAL_CACHE_WARNING,
+                              RECIPES_VERSION_KEY, bump_version,
+                              is_shared_cache)
+
+# Справочник: модель, колонки CSV и поля уникального ключа.
+MODELS = {
+    'ingredients': (
+        Ingredient, ('name', 'measurement_unit'), ('name', 'measurement_unit')
+    ),
+    'tags': (Tag, ('name', 'color', 'slug'), ('name',)),
+}
+SEPARATORS = re.compile(r'[\s,]*')
+
+
+def iter_json_array(file, chunk_size=64 * 1024):
+    """Читает объекты из JSON-массива по одному, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(chunk_size).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('Ожидается JSON-массив объектов')
+    position = 1
+    while True:
+        position = SEPARATORS.match(buffer, position).end()
+        if buffer.startswith(']', position):
+            return
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                raise CommandError('Файл JSON оборван')
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield item
+
+
+def iter_rows(path, fields):
+    with open(path, encoding='utf-8', newline='') as file:
+        if path.endswith('.csv'):
+            for row in csv.reader(file):
+                if row:
+                    yield dict(zip(fields, row))
+        else:
+            yield from iter_json_array(file)
+
+
+class Command(BaseCommand):
+    help = ('Загружает ингредиенты или теги из CSV/JSON пакетами, '
+            'пропуская уже существующие записи')
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+')
+        parser.add_argument(
+            '--model', choices=MODELS,
+            help='Справочник; по умолчанию определяется по имени файла')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        total = created = 0
+        with transaction.atomic():
+            for path in options['paths']:
+                model, fields, key_fields = MODELS[
+                    options['model'] or self.guess_model(path)]
+                before = model.objects.count()
+                total += self.load(
+                    model, iter_rows(path, fields), key_fields,
+                    options['batch_size'])
+                created += model.objects.count() - before
+            # bulk_create не отправляет сигналы, которые сбрасывают
+            # справочник и кэш рецептов.
+            invalidate_catalogue()
+            bump_version(RECIPES_VERSION_KEY)
+            bump_version(FEED_VERSION_KEY)
+        if not is_shared_cache():
+            self.stderr.write(self.style.WARNING(LOCAL_CACHE_WARNING))
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Прочитано строк: {total}, добавлено: {created}, '
+            f'{total / elapsed:.0f} строк/с'))
+
+    @staticmethod
+    def guess_model(path):
+        name = os.path.splitext(os.path.basename(path))[0]
+        if name not in MODELS:
+            raise CommandError(
+                f'Не удалось определить справочник для {path}, '
+                'укажите --model')
+        return name
+
+    @staticmethod
+    def load(model, rows, key_fields, batch_size):
+        """Вставляет строки пакетами; повторы внутри файла отбрасываются
+        заранее, а конфликты с базой пропускает ignore_conflicts."""
+        seen = set()
+        batch = []
+        total = 0
+        for row in rows:
+            total += 1
+            key = tuple(row.get(field) for field in key_fields)
+            if key in seen:
+                continue
+            seen.add(key)
+            batch.append(model(**row))
+            if len(batch) == batch_size:
+                model.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        model.objects.bulk_create(batch, ignore_conflicts=True)
+        return total
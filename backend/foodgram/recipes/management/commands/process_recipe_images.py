@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import needs_processing, process_recipe_image
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = ('Удаляет метаданные и строит уменьшенные копии картинок '
+            'рецептов, для которых они еще не построены')
+
+    def handle(self, *args, **options):
+        processed = 0
+        for recipe in Recipe.objects.exclude(image='').iterator():
+            if needs_processing(recipe):
+                process_recipe_image(recipe.pk)
+                processed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {processed}'))
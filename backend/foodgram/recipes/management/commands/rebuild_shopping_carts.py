@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import ShoppingCartIngredient
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает агрегированные списки покупок пользователей '
+            'по содержимому корзин')
+
+    def handle(self, *args, **options):
+        ShoppingCartIngredient.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            'Списки покупок пересчитаны, записей: '
+            f'{ShoppingCartIngredient.objects.count()}'
+        ))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from recipes.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счетчики избранного, списков покупок, '
+            'рецептов и подписчиков')
+
+    def handle(self, *args, **options):
+        reconcile_counters()
+        self.stdout.write(self.style.SUCCESS('Счетчики пересчитаны'))
@@ -0,0 +1,144 @@
+import random
+import time
+from io import BytesIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from PIL import Image
+
+from recipes.counters import reconcile_counters
+from recipes.models import (FavoriteRecipes, Ingredient, IngredientInRecipe,
+                            Recipe, ShoppingCartIngredient, ShoppingCarts, Tag,
+                            User)
+from recipes.versions import (FEED_VERSION_KEY, LOCAL_CACHE_WARNING,
+                              RECIPES_VERSION_KEY, bump_version,
+                              is_shared_cache)
+from users.models import Subscription
+
+USERNAME_PREFIX = 'bench'
+PASSWORD = 'benchmark'
+
+
+class Command(BaseCommand):
+    help = ('Создает пользователей, рецепты, избранное, списки покупок и '
+            'подписки для нагрузочного тестирования API')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes-per-user', type=int, default=10)
+        parser.add_argument('--tags-per-recipe', type=int, default=2)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--favorites-per-user', type=int, default=20)
+        parser.add_argument('--carts-per-user', type=int, default=5)
+        parser.add_argument('--subscriptions-per-user', type=int, default=10)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Зерно генератора, чтобы данные повторялись между запусками')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        tag_ids = list(Tag.objects.values_list('id', flat=True))
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        if (len(tag_ids) < options['tags_per_recipe']
+                or len(ingredient_ids) < options['ingredients_per_recipe']):
+            raise CommandError(
+                'Недостаточно тегов или ингредиентов, загрузите справочники '
+                'командой load_catalogue')
+        started = time.monotonic()
+        with transaction.atomic():
+            users = self.create_users(options['users'])
+            recipes = self.create_recipes(
+                users, options['recipes_per_user'])
+            self.create_links(
+                users, recipes, tag_ids, ingredient_ids, options)
+            # bulk_create не отправляет сигналы, поэтому счетчики,
+            # списки покупок и версии кэша обновляются целиком.
+            reconcile_counters()
+            ShoppingCartIngredient.objects.rebuild()
+            bump_version(RECIPES_VERSION_KEY)
+            bump_version(FEED_VERSION_KEY)
+        if not is_shared_cache():
+            self.stderr.write(self.style.WARNING(LOCAL_CACHE_WARNING))
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(users)}, рецептов: {len(recipes)} '
+            f'за {time.monotonic() - started:.1f} с. '
+            f'Пароль пользователей {USERNAME_PREFIX}*: {PASSWORD}'))
+
+    def bulk_create(self, model, objects):
+        return model.objects.bulk_create(
+            objects, batch_size=self.batch_size)
+
+    def create_users(self, count):
+        offset = User.objects.filter(
+            username__startswith=USERNAME_PREFIX).count()
+        password = make_password(PASSWORD)
+        return self.bulk_create(User, [
+            User(
+                username=f'{USERNAME_PREFIX}{number}',
+                email=f'{USERNAME_PREFIX}{number}@example.com',
+                first_name='Бенчмарк',
+                last_name=str(number),
+                password=password,
+            ) for number in range(offset, offset + count)
+        ])
+
+    def create_recipes(self, users, per_user):
+        # Одна картинка на все рецепты: хранилище картинок адресуется по
+        # содержимому, и файл записывается один раз.
+        buffer = BytesIO()
+        Image.new('RGB', (640, 480), 'orange').save(buffer, 'JPEG')
+        image = Recipe._meta.get_field('image')
+        image_name = image.storage.save(
+            image.generate_filename(None, 'benchmark.jpg'),
+            ContentFile(buffer.getvalue()))
+        return self.bulk_create(Recipe, [
+            Recipe(
+                author=user,
+                name=f'Рецепт {user.username}-{number}',
+                image=image_name,
+                text='Рецепт для нагрузочного тестирования.',
+                cooking_time=self.random.randint(1, 180),
+            ) for user in users for number in range(per_user)
+        ])
+
+    def create_links(self, users, recipes, tag_ids, ingredient_ids, options):
+        sample = self.random.sample
+        self.bulk_create(Recipe.tags.through, [
+            Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag_id)
+            for recipe in recipes
+            for tag_id in sample(tag_ids, options['tags_per_recipe'])
+        ])
+        self.bulk_create(IngredientInRecipe, [
+            IngredientInRecipe(
+                recipe=recipe,
+                ingredient_id=ingredient_id,
+                amount=self.random.randint(1, 500),
+            )
+            for recipe in recipes
+            for ingredient_id in sample(
+                ingredient_ids, options['ingredients_per_recipe'])
+        ])
+        for model, per_user in ((FavoriteRecipes, 'favorites_per_user'),
+                                (ShoppingCarts, 'carts_per_user')):
+            count = min(options[per_user], len(recipes))
+            self.bulk_create(model, [
+                model(user=user, recipe=recipe)
+                for user in users for recipe in sample(recipes, count)
+            ])
+        count = min(options['subscriptions_per_user'], len(users) - 1)
+        subscriptions = []
+        for user in users:
+            authors = [
+                author for author in sample(users, count + 1)
+                if author != user
+            ]
+            subscriptions.extend(
+                Subscription(user=user, author=author)
+                for author in authors[:count]
+            )
+        self.bulk_create(Subscription, subscriptions)
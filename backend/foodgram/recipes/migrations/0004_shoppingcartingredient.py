@@ -0,0 +1,60 @@
+# Generated by Django 4.1.6 on 2026-10-18 17:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_cart_ingredients(apps, schema_editor):
+    IngredientInRecipe = apps.get_model('recipes', 'IngredientInRecipe')
+    ShoppingCartIngredient = apps.get_model(
+        'recipes', 'ShoppingCartIngredient')
+    totals = (
+        IngredientInRecipe.objects
+        .filter(recipe__recipe_carts__isnull=False)
+        .values('ingredient_id',
+                user_id=models.F('recipe__recipe_carts__user_id'))
+        .annotate(total=models.Sum('amount'))
+        .order_by()
+    )
+    ShoppingCartIngredient.objects.bulk_create(
+        (ShoppingCartIngredient(
+            user_id=row['user_id'],
+            ingredient_id=row['ingredient_id'],
+            amount=row['total']
+        ) for row in totals.iterator()),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0003_database_prefill'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingCartIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField(verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cart_ingredients', to='recipes.ingredient', verbose_name='Ингридиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cart_ingredients', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Ингридиент в списке покупок',
+                'verbose_name_plural': 'Ингридиенты в списках покупок',
+                'ordering': ('user', 'ingredient'),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcartingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_cart_ingredient'),
+        ),
+        migrations.RunPython(
+            fill_cart_ingredients,
+            migrations.RunPython.noop
+        ),
+    ]
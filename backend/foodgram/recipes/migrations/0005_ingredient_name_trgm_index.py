@@ -0,0 +1,33 @@
+from django.db import migrations
+
+CREATE_INDEX_SQL = (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS recipes_ingredient_name_trgm '
+    'ON recipes_ingredient USING gin (UPPER(name::text) gin_trgm_ops)',
+)
+DROP_INDEX_SQL = (
+    'DROP INDEX IF EXISTS recipes_ingredient_name_trgm',
+)
+
+
+def run_postgresql_only(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_shoppingcartingredient'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_postgresql_only(CREATE_INDEX_SQL),
+            run_postgresql_only(DROP_INDEX_SQL)
+        ),
+    ]
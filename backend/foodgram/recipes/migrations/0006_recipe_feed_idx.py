@@ -0,0 +1,17 @@
+# Generated by Django 4.1.6 on 2026-10-18 17:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_ingredient_name_trgm_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-create_date', '-id'], name='recipe_feed_idx'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.1.6 on 2026-10-18 17:56
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+fill_cart_ingredients = import_module(
+    'recipes.migrations.0004_shoppingcartingredient'
+).fill_cart_ingredients
+
+
+def delete_duplicates(model, fields):
+    duplicates = (
+        model.objects
+        .values(*fields)
+        .annotate(min_id=models.Min('id'), count=models.Count('id'))
+        .filter(count__gt=1)
+        .order_by()
+    )
+    for row in duplicates:
+        (model.objects
+         .filter(**{field: row[field] for field in fields})
+         .exclude(id=row['min_id'])
+         .delete())
+
+
+def remove_duplicates(apps, schema_editor):
+    delete_duplicates(
+        apps.get_model('recipes', 'FavoriteRecipes'), ('user', 'recipe'))
+    delete_duplicates(
+        apps.get_model('recipes', 'ShoppingCarts'), ('user', 'recipe'))
+    delete_duplicates(
+        apps.get_model('recipes', 'IngredientInRecipe'),
+        ('recipe', 'ingredient'))
+    apps.get_model('recipes', 'ShoppingCartIngredient').objects.all().delete()
+    fill_cart_ingredients(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_feed_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_duplicates,
+            migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='favoriterecipes',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_favorite'),
+        ),
+        migrations.AddConstraint(
+            model_name='ingredientinrecipe',
+            constraint=models.UniqueConstraint(fields=('recipe', 'ingredient'), name='unique_ingredient_in_recipe'),
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcarts',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_shopping_cart'),
+        ),
+    ]
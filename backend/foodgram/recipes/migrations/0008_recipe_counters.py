@@ -0,0 +1,34 @@
+# Generated by Django 4.1.6 on 2026-10-18 17:57
+
+from django.db import migrations, models
+
+from recipes.counters import reconcile_counters
+
+
+def fill_counters(apps, schema_editor):
+    reconcile_counters(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_unique_user_lists'),
+        ('users', '0003_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='cart_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Добавлений в список покупок'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Добавлений в избранное'),
+        ),
+        migrations.RunPython(
+            fill_counters,
+            migrations.RunPython.noop
+        ),
+    ]
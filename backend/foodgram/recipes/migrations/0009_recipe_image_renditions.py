@@ -0,0 +1,23 @@
+# Generated by Django 4.1.6 on 2026-10-18 18:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_medium',
+            field=models.ImageField(blank=True, editable=False, upload_to='recipes/renditions/', verbose_name='Картинка среднего размера'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='image_thumbnail',
+            field=models.ImageField(blank=True, editable=False, upload_to='recipes/renditions/', verbose_name='Миниатюра картинки'),
+        ),
+    ]
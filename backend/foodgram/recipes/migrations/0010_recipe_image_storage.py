@@ -0,0 +1,20 @@
+# Generated by Django 4.1.6 on 2026-10-18 18:03
+
+from django.db import migrations, models
+
+import recipes.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(storage=recipes.storage.ContentAddressedStorage(), upload_to='recipes/images/', verbose_name='Ссылка на картинку на сайте'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.6 on 2026-10-18 19:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_recipe_image_storage'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-favorites_count', '-create_date', '-id'], name='recipe_popular_idx'),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+
+from .storage import content_addressed_storage
 
 User = get_user_model()
 
@@ -55,10 +57,19 @@ class Ingredient(models.Model):
 
 
 class RecipeQuerySet(models.QuerySet):
-    def filtered_by_tags(self, tags):
-        if tags:
-            return self.filter(tags__slug__in=tags).distinct()
-        return self
+    def filtered_by_tags(self, tag_ids):
+        """Рецепты хотя бы с одним из тегов, полусоединением через EXISTS.
+
+        В отличие от JOIN по тегам не дублирует строки и не требует
+        DISTINCT; подзапрос обслуживается уникальным индексом
+        (recipe_id, tag_id) промежуточной таблицы.
+        """
+        return self.filter(models.Exists(
+            Recipe.tags.through.objects.filter(
+                recipe_id=models.OuterRef('pk'),
+                tag_id__in=tag_ids
+            )
+        ))
 
     def add_user_annotations(self, user_id):
         return self.annotate(
@@ -76,6 +87,16 @@ class RecipeQuerySet(models.QuerySet):
             )
         )
 
+    def with_related(self, user_id):
+        return self.prefetch_related(
+            models.Prefetch(
+                'author',
+                queryset=User.objects.add_subscription_annotation(user_id)
+            ),
+            'tags',
+            'ingredientinrecipe_set'
+        )
+
 
 class Recipe(models.Model):
     author = models.ForeignKey(
@@ -89,8 +110,19 @@ class Recipe(models.Model):
         verbose_name='Название')
     image = models.ImageField(
         upload_to='recipes/images/',
+        storage=content_addressed_storage,
         blank=False,
         verbose_name='Ссылка на картинку на сайте')
+    image_thumbnail = models.ImageField(
+        upload_to='recipes/renditions/',
+        blank=True,
+        editable=False,
+        verbose_name='Миниатюра картинки')
+    image_medium = models.ImageField(
+        upload_to='recipes/renditions/',
+        blank=True,
+        editable=False,
+        verbose_name='Картинка среднего размера')
     text = models.TextField(
         blank=False,
         verbose_name='Описание')
@@ -109,6 +141,12 @@ class Recipe(models.Model):
     create_date = models.DateTimeField(
         verbose_name='Дата добавления',
         auto_now_add=True)
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Добавлений в избранное',
+        default=0)
+    cart_count = models.PositiveIntegerField(
+        verbose_name='Добавлений в список покупок',
+        default=0)
 
     objects = RecipeQuerySet.as_manager()
 
@@ -116,6 +154,16 @@ class Recipe(models.Model):
         ordering = ('-create_date',)
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                name='recipe_feed_idx',
+                fields=['-create_date', '-id'],
+            ),
+            models.Index(
+                name='recipe_popular_idx',
+                fields=['-favorites_count', '-create_date', '-id'],
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -141,6 +189,12 @@ class IngredientInRecipe(models.Model):
         ordering = ('ingredient',)
         verbose_name = 'Ингридиент в рецепте'
         verbose_name_plural = 'Ингридиенты в рецепте'
+        constraints = [
+            models.UniqueConstraint(
+                name='unique_ingredient_in_recipe',
+                fields=['recipe', 'ingredient'],
+            ),
+        ]
 
     def __str__(self):
         return f'{self.ingredient} в количестве {self.amount}'
@@ -166,6 +220,12 @@ class FavoriteRecipes(models.Model):
         ordering = ('recipe',)
         verbose_name = 'Избранное'
         verbose_name_plural = 'Избранное'
+        constraints = [
+            models.UniqueConstraint(
+                name='unique_favorite',
+                fields=['user', 'recipe'],
+            ),
+        ]
 
     def __str__(self):
         return (f' Рецепт {self.recipe} в избранном у '
@@ -193,7 +253,99 @@ class ShoppingCarts(models.Model):
         default_related_name = 'shopping_cart'
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Списки покупок'
+        constraints = [
+            models.UniqueConstraint(
+                name='unique_shopping_cart',
+                fields=['user', 'recipe'],
+            ),
+        ]
 
     def __str__(self):
         return (f' Рецепт {self.recipe} в списке покупок у '
                 f'{self.user}')
+
+
+class ShoppingCartIngredientQuerySet(models.QuerySet):
+    def _replace(self, users, stale, totals_filter):
+        totals = (
+            IngredientInRecipe.objects
+            .filter(totals_filter, recipe__recipe_carts__isnull=False)
+            .values('ingredient_id',
+                    user_id=models.F('recipe__recipe_carts__user_id'))
+            .annotate(total=models.Sum('amount'))
+            .order_by()
+        )
+        with transaction.atomic():
+            # Пересчеты одного пользователя идут по очереди, и суммы
+            # считаются после блокировки, иначе при READ COMMITTED два
+            # пересчета вставят одну пару. NO KEY UPDATE не конфликтует
+            # с блокировками внешних ключей при вставке в корзину.
+            list(
+                users.select_for_update(no_key=True)
+                .order_by('pk')
+                .values_list('pk', flat=True)
+            )
+            stale.delete()
+            self.bulk_create(
+                (ShoppingCartIngredient(
+                    user_id=row['user_id'],
+                    ingredient_id=row['ingredient_id'],
+                    amount=row['total']
+                ) for row in totals.iterator()),
+                batch_size=1000
+            )
+
+    def refresh(self, user_ids, ingredient_ids):
+        """Пересчитывает суммы только для затронутых пар
+        (пользователь, ингредиент)."""
+        user_ids, ingredient_ids = set(user_ids), set(ingredient_ids)
+        if not user_ids or not ingredient_ids:
+            return
+        self._replace(
+            User.objects.filter(pk__in=user_ids),
+            self.filter(user_id__in=user_ids,
+                        ingredient_id__in=ingredient_ids),
+            models.Q(recipe__recipe_carts__user_id__in=user_ids,
+                     ingredient_id__in=ingredient_ids)
+        )
+
+    def rebuild(self):
+        """Полностью пересчитывает списки покупок всех пользователей."""
+        self._replace(User.objects.all(), self.all(), models.Q())
+
+
+class ShoppingCartIngredient(models.Model):
+    """Суммарное количество ингредиента в списке покупок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=False,
+        related_name='cart_ingredients',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        null=False,
+        related_name='cart_ingredients',
+        verbose_name='Ингридиент'
+    )
+    amount = models.PositiveIntegerField(
+        verbose_name='Количество')
+
+    objects = ShoppingCartIngredientQuerySet.as_manager()
+
+    class Meta:
+        ordering = ('user', 'ingredient')
+        verbose_name = 'Ингридиент в списке покупок'
+        verbose_name_plural = 'Ингридиенты в списках покупок'
+        constraints = [
+            models.UniqueConstraint(
+                name='unique_cart_ingredient',
+                fields=['user', 'ingredient'],
+            ),
+        ]
+
+    def __str__(self):
+        return (f'{self.ingredient} в количестве {self.amount} в списке '
+                f'покупок у {self.user}')
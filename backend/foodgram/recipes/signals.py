@@ -0,0 +1,179 @@
+from django.apps import apps
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from .catalogue import invalidate_catalogue
+from .counters import COUNTERS, change_counter
+from .images import needs_processing, schedule_image_processing
+from .models import (FavoriteRecipes, Ingredient, IngredientInRecipe, Recipe,
+                     ShoppingCartIngredient, ShoppingCarts, Tag, User)
+from .user_lists import invalidate_user_lists
+from .versions import FEED_VERSION_KEY, RECIPES_VERSION_KEY, bump_version
+from users.models import Subscription
+
+# Поля автора, которые выводятся в ленте рецептов.
+FEED_USER_FIELDS = ('email', 'username', 'first_name', 'last_name')
+
+
+def recipe_ingredient_ids(recipe_ids):
+    return IngredientInRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by().values_list('ingredient_id', flat=True)
+
+
+def recipe_cart_user_ids(recipe_ids):
+    return ShoppingCarts.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by().values_list('user_id', flat=True)
+
+
+def pending_cart_changes(origin):
+    """Строки корзин и рецептов, удаляемые одной операцией.
+
+    Django отправляет все pre_delete до удаления первой строки, поэтому
+    к последнему post_delete известны все удаленные строки, и агрегат
+    пересчитывается один раз на операцию, а не на каждую строку.
+    """
+    changes = getattr(origin, '_cart_changes', None)
+    if changes is None:
+        changes = origin._cart_changes = {
+            'pending': 0, 'carts': set(), 'ingredients': set()}
+    return changes
+
+
+def refresh_deleted(changes):
+    carts, ingredients = changes['carts'], changes['ingredients']
+    user_ids = {user_id for user_id, _ in carts}
+    ingredient_ids = {ingredient_id for _, ingredient_id in ingredients}
+    if ingredients:
+        user_ids.update(recipe_cart_user_ids(
+            {recipe_id for recipe_id, _ in ingredients}))
+    if carts:
+        ingredient_ids.update(recipe_ingredient_ids(
+            {recipe_id for _, recipe_id in carts}))
+    ShoppingCartIngredient.objects.refresh(user_ids, ingredient_ids)
+
+
+@receiver(pre_delete, sender=ShoppingCarts)
+def cart_pre_delete(sender, instance, origin=None, **kwargs):
+    changes = pending_cart_changes(instance if origin is None else origin)
+    changes['pending'] += 1
+    changes['carts'].add((instance.user_id, instance.recipe_id))
+
+
+@receiver(pre_delete, sender=IngredientInRecipe)
+def recipe_ingredient_pre_delete(sender, instance, origin=None, **kwargs):
+    changes = pending_cart_changes(instance if origin is None else origin)
+    changes['pending'] += 1
+    changes['ingredients'].add((instance.recipe_id, instance.ingredient_id))
+
+
+@receiver(post_delete, sender=ShoppingCarts)
+@receiver(post_delete, sender=IngredientInRecipe)
+def cart_rows_deleted(sender, instance, origin=None, **kwargs):
+    if origin is None:
+        origin = instance
+    changes = pending_cart_changes(origin)
+    changes['pending'] -= 1
+    if not changes['pending']:
+        del origin._cart_changes
+        refresh_deleted(changes)
+
+
+@receiver(post_save, sender=ShoppingCarts)
+def cart_saved(sender, instance, **kwargs):
+    ShoppingCartIngredient.objects.refresh(
+        [instance.user_id],
+        recipe_ingredient_ids([instance.recipe_id])
+    )
+
+
+@receiver(post_save, sender=IngredientInRecipe)
+def recipe_ingredient_saved(sender, instance, **kwargs):
+    ShoppingCartIngredient.objects.refresh(
+        recipe_cart_user_ids([instance.recipe_id]),
+        [instance.ingredient_id]
+    )
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def catalogue_changed(sender, **kwargs):
+    invalidate_catalogue()
+    bump_version(RECIPES_VERSION_KEY)
+    bump_version(FEED_VERSION_KEY)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=IngredientInRecipe)
+@receiver(post_delete, sender=IngredientInRecipe)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipes_changed(sender, **kwargs):
+    bump_version(RECIPES_VERSION_KEY)
+    bump_version(FEED_VERSION_KEY)
+
+
+@receiver(pre_save, sender=User)
+def author_pre_save(sender, instance, update_fields=None, **kwargs):
+    # Вход (last_login), регистрация и пользователи без рецептов не
+    # меняют ленту; удаление автора сбрасывает ее через его рецепты.
+    instance._feed_changed = False
+    if not instance.pk or not instance.recipes_count:
+        return
+    fields = FEED_USER_FIELDS
+    if update_fields is not None:
+        fields = [field for field in fields if field in update_fields]
+        if not fields:
+            return
+    saved = User.objects.filter(pk=instance.pk).values(*fields).first()
+    instance._feed_changed = saved != {
+        field: getattr(instance, field) for field in fields}
+
+
+@receiver(post_save, sender=User)
+def author_saved(sender, instance, **kwargs):
+    if getattr(instance, '_feed_changed', False):
+        recipes_changed(sender)
+
+
+@receiver(post_save, sender=FavoriteRecipes)
+@receiver(post_delete, sender=FavoriteRecipes)
+@receiver(post_save, sender=ShoppingCarts)
+@receiver(post_delete, sender=ShoppingCarts)
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def user_lists_changed(sender, instance, **kwargs):
+    invalidate_user_lists(instance.user_id)
+    bump_version(FEED_VERSION_KEY)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_saved(sender, instance, **kwargs):
+    if needs_processing(instance):
+        schedule_image_processing(instance.pk)
+
+
+def connect_counter(source, target, relation, field):
+    def added(sender, instance, created, **kwargs):
+        if created:
+            change_counter(
+                target, getattr(instance, f'{relation}_id'), field, 1)
+
+    def removed(sender, instance, origin=None, **kwargs):
+        pk = getattr(instance, f'{relation}_id')
+        if isinstance(origin, target) and origin.pk == pk:
+            # Строка со счетчиком удаляется той же операцией.
+            return
+        change_counter(target, pk, field, -1)
+
+    post_save.connect(added, sender=source, weak=False)
+    post_delete.connect(removed, sender=source, weak=False)
+
+
+for source, target, relation, field in COUNTERS:
+    connect_counter(
+        apps.get_model(*source), apps.get_model(*target), relation, field)
@@ -0,0 +1,47 @@
+"""Хранилище картинок рецептов с адресацией по содержимому.
+
+Файл сохраняется под именем, равным sha256 его содержимого. Повторная
+загрузка той же картинки не создает новый файл, а возвращает имя уже
+сохраненного и обновляет время его изменения: команда
+collect_recipe_images удаляет только давно не использованные файлы.
+"""
+import hashlib
+import os
+
+from django.core.files.base import File
+from django.core.files.storage import get_storage_class
+
+
+def touch(storage, name):
+    """Обновляет время изменения файла; False, если файла нет."""
+    try:
+        os.utime(storage.path(name))
+    except FileNotFoundError:
+        return False
+    return True
+
+
+class ContentAddressedStorage(get_storage_class()):
+
+    def content_name(self, name, content):
+        """Возвращает имя файла по хешу содержимого с исходным расширением."""
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        dirname, basename = os.path.split(name)
+        ext = os.path.splitext(basename)[1].lower()
+        return os.path.join(dirname, digest.hexdigest() + ext)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.content_name(name, content)
+        if touch(self, name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+
+content_addressed_storage = ContentAddressedStorage()
@@ -0,0 +1,37 @@
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from rest_framework.test import APIClient
+
+
+@override_settings(CATALOGUE_VERSION_CHECK_INTERVAL=0)
+class CacheTestCase(TestCase):
+    """TestCase с пустым кэшем перед каждым тестом.
+
+    Очистка кэша меняет версии данных, поэтому справочник в памяти
+    процесса перечитывается при первом обращении в тесте.
+    """
+    client_class = APIClient
+
+    def setUp(self):
+        cache.clear()
+
+
+class TempMediaMixin:
+    """Временный каталог MEDIA_ROOT на время тестов класса."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.media_root)
+        media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        media_settings.enable()
+        cls.addClassCleanup(media_settings.disable)
+        super().setUpClass()
+
+
+class MediaTestCase(TempMediaMixin, CacheTestCase):
+    """CacheTestCase с временным каталогом MEDIA_ROOT."""
@@ -0,0 +1,67 @@
+"""Создание пользователей, справочников, рецептов и картинок для тестов."""
+import base64
+from io import BytesIO
+from itertools import count
+
+from PIL import Image
+
+from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag, User
+
+IMAGE_NAME = 'recipes/images/test.jpg'
+
+_numbers = count()
+
+
+def create_user(**kwargs):
+    number = next(_numbers)
+    kwargs.setdefault('username', f'user{number}')
+    kwargs.setdefault('email', f'user{number}@example.com')
+    kwargs.setdefault('first_name', 'Имя')
+    kwargs.setdefault('last_name', f'Фамилия {number}')
+    kwargs.setdefault('password', 'password')
+    return User.objects.create_user(**kwargs)
+
+
+def create_tags(total):
+    return Tag.objects.bulk_create(
+        Tag(name=f'Тег {number}', color='#FFA500', slug=f'tag{number}')
+        for number in (next(_numbers) for _ in range(total))
+    )
+
+
+def create_ingredients(total):
+    return Ingredient.objects.bulk_create(
+        Ingredient(name=f'Ингредиент {number}', measurement_unit='г')
+        for number in (next(_numbers) for _ in range(total))
+    )
+
+
+def create_recipe(author, tags=(), ingredients=(), **kwargs):
+    kwargs.setdefault('name', f'Рецепт {next(_numbers)}')
+    kwargs.setdefault('text', 'Описание рецепта')
+    kwargs.setdefault('cooking_time', 10)
+    kwargs.setdefault('image', IMAGE_NAME)
+    recipe = Recipe.objects.create(author=author, **kwargs)
+    recipe.tags.set(tags)
+    IngredientInRecipe.objects.bulk_create(
+        IngredientInRecipe(recipe=recipe, ingredient=ingredient,
+                           amount=amount)
+        for amount, ingredient in enumerate(ingredients, start=1)
+    )
+    return recipe
+
+
+def create_recipes(total, author, tags=(), ingredients=()):
+    return [
+        create_recipe(author, tags, ingredients) for _ in range(total)
+    ]
+
+
+def create_image(format='PNG', size=(8, 8), **options):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'orange').save(buffer, format=format, **options)
+    return buffer.getvalue()
+
+
+def image_data_url(content, ext='png'):
+    return f'data:image/{ext};base64,{base64.b64encode(content).decode()}'
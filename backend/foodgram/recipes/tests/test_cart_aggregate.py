@@ -0,0 +1,79 @@
+from django.db.models import Sum
+
+from recipes.models import (IngredientInRecipe, ShoppingCartIngredient,
+                            ShoppingCarts)
+from recipes.tests.cases import CacheTestCase
+from recipes.tests.factories import (create_ingredients, create_recipe,
+                                     create_tags, create_user)
+
+
+class ShoppingCartIngredientTest(CacheTestCase):
+    """Агрегат списка покупок пересчитывается один раз на операцию."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user()
+        cls.users = [create_user() for _ in range(4)]
+        cls.tags = create_tags(2)
+        cls.ingredients = create_ingredients(8)
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = create_recipe(self.author, self.tags, self.ingredients)
+        self.other = create_recipe(
+            self.author, self.tags, self.ingredients[:3])
+        for user in self.users:
+            ShoppingCarts.objects.create(user=user, recipe=self.recipe)
+            ShoppingCarts.objects.create(user=user, recipe=self.other)
+
+    def assert_aggregate_matches_carts(self):
+        expected = {
+            (row['recipe__recipe_carts__user_id'], row['ingredient_id']):
+                row['total']
+            for row in IngredientInRecipe.objects
+            .filter(recipe__recipe_carts__isnull=False)
+            .values('recipe__recipe_carts__user_id', 'ingredient_id')
+            .annotate(total=Sum('amount'))
+        }
+        actual = {
+            (row.user_id, row.ingredient_id): row.amount
+            for row in ShoppingCartIngredient.objects.all()
+        }
+        self.assertEqual(actual, expected)
+
+    def test_delete_recipe(self):
+        # Выборки и удаления каскада, один пересчет агрегата для
+        # 8 ингредиентов в 4 корзинах и счетчик рецептов автора.
+        with self.assertNumQueries(16):
+            self.recipe.delete()
+        self.assert_aggregate_matches_carts()
+        self.assertEqual(ShoppingCartIngredient.objects.count(), 4 * 3)
+
+    def test_delete_recipe_ingredients(self):
+        # Выборка, удаление и один пересчет агрегата.
+        with self.assertNumQueries(9):
+            IngredientInRecipe.objects.filter(
+                recipe=self.recipe, ingredient__in=self.ingredients[:2]
+            ).delete()
+        self.assert_aggregate_matches_carts()
+
+    def test_remove_from_cart(self):
+        ShoppingCarts.objects.get(
+            user=self.users[0], recipe=self.recipe).delete()
+        self.assert_aggregate_matches_carts()
+
+    def test_update_ingredients(self):
+        self.client.force_authenticate(self.author)
+        response = self.client.patch(
+            f'/api/recipes/{self.recipe.pk}/',
+            {
+                'tags': [tag.pk for tag in self.tags],
+                'ingredients': [
+                    {'id': self.ingredients[0].pk, 'amount': 100},
+                    {'id': self.ingredients[1].pk, 'amount': 2},
+                ],
+            },
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assert_aggregate_matches_carts()
@@ -0,0 +1,50 @@
+from django.core.cache import cache
+from django.test import override_settings
+
+from rest_framework.authtoken.models import Token
+
+from recipes.catalogue import get_catalogue, get_positions
+from recipes.tests.cases import CacheTestCase
+from recipes.tests.factories import (create_ingredients, create_tags,
+                                     create_user)
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class CatalogueMissTest(CacheTestCase):
+    """Промах по снимку справочника не перечитывает его целиком."""
+
+    def setUp(self):
+        super().setUp()
+        get_catalogue(force=True)
+
+    def test_unknown_ingredient(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/ingredients/999999/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_ingredient_missing_from_snapshot(self):
+        # bulk_create не отправляет сигналы, снимок остается прежним.
+        ingredient, = create_ingredients(1)
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/ingredients/{ingredient.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['name'], ingredient.name)
+
+    def test_positions_missing_from_snapshot(self):
+        known = get_catalogue().tags[0]['id']
+        first, second = sorted(create_tags(2), key=lambda tag: tag.name)
+        with self.assertNumQueries(1):
+            positions = get_positions(
+                'tag_positions', [second.pk, known, first.pk])
+        self.assertLess(positions[known], positions[first.pk])
+        self.assertLess(positions[first.pk], positions[second.pk])
+        self.assertNotIn(first.pk, get_catalogue().tag_positions)
+
+    def test_unknown_ingredient_cold_catalogue(self):
+        user = create_user()
+        token = Token.objects.create(user=user)
+        cache.clear()
+        response = self.client.get(
+            '/api/ingredients/999999/',
+            HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,20 @@
+from django.test import SimpleTestCase, override_settings
+
+from recipes.checks import check_shared_cache
+
+
+class SharedCacheCheckTest(SimpleTestCase):
+    """Проверка --deploy предупреждает о кэше в памяти процесса."""
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_local_cache(self):
+        self.assertEqual(
+            [error.id for error in check_shared_cache(None)],
+            ['recipes.W001'])
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://localhost:6379/1'}})
+    def test_shared_cache(self):
+        self.assertEqual(check_shared_cache(None), [])
@@ -0,0 +1,56 @@
+import os
+import time
+from io import StringIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+
+from recipes.storage import content_addressed_storage
+from recipes.tests.cases import MediaTestCase
+from recipes.tests.factories import create_image, create_recipe, create_user
+
+DAY = 60 * 60 * 24
+
+
+class CollectRecipeImagesTest(MediaTestCase):
+    """Сборщик удаляет только давно не использованные файлы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user()
+
+    def setUp(self):
+        super().setUp()
+        self.content = create_image()
+        self.name = self.save()
+        self.make_old(self.name)
+
+    def save(self):
+        return content_addressed_storage.save(
+            'recipes/images/image.png', ContentFile(self.content))
+
+    def make_old(self, name):
+        old = time.time() - DAY
+        os.utime(content_addressed_storage.path(name), (old, old))
+
+    def collect(self):
+        call_command('collect_recipe_images', stdout=StringIO())
+        return content_addressed_storage.exists(self.name)
+
+    def test_removes_old_orphan(self):
+        self.assertFalse(self.collect())
+
+    def test_keeps_reuploaded_orphan(self):
+        self.assertEqual(self.save(), self.name)
+        self.assertTrue(self.collect())
+
+    def test_keeps_file_referenced_during_collection(self):
+        listdir = content_addressed_storage.listdir
+
+        def listdir_and_reference(path):
+            create_recipe(self.author, image=self.name)
+            return listdir(path)
+        with mock.patch.object(content_addressed_storage, 'listdir',
+                               listdir_and_reference):
+            self.assertTrue(self.collect())
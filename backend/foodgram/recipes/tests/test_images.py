@@ -0,0 +1,126 @@
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, override_settings
+
+from PIL import ExifTags, Image
+
+from recipes.images import (_clean_original, process_recipe_image,
+                            rendition_name)
+from recipes.storage import content_addressed_storage
+from recipes.tests.cases import MediaTestCase
+from recipes.tests.factories import (create_image, create_ingredients,
+                                     create_recipe, create_tags, create_user,
+                                     image_data_url)
+
+
+def open_image(content):
+    return Image.open(BytesIO(content))
+
+
+def exif(**tags):
+    data = Image.Exif()
+    for name, value in tags.items():
+        data[getattr(ExifTags.Base, name)] = value
+    return data
+
+
+class CleanOriginalTest(SimpleTestCase):
+    """Оригинал очищается от метаданных без лишних потерь."""
+
+    def test_jpeg_keeps_quality(self):
+        original = create_image(
+            'JPEG', (64, 32), quality=60, exif=exif(Make='Camera'))
+        _, content = _clean_original(open_image(original))
+        cleaned = open_image(content)
+        self.assertEqual(cleaned.quantization,
+                         open_image(original).quantization)
+        self.assertNotIn('exif', cleaned.info)
+
+    def test_mpo_saved_as_jpeg(self):
+        frames = [Image.new('RGB', (64, 32), color)
+                  for color in ('orange', 'blue')]
+        buffer = BytesIO()
+        frames[0].save(buffer, 'MPO', save_all=True,
+                       append_images=frames[1:], quality=60,
+                       exif=exif(Make='Camera'))
+        original = open_image(buffer.getvalue())
+        self.assertEqual(original.format, 'MPO')
+        _, content = _clean_original(original)
+        cleaned = open_image(content)
+        self.assertEqual(cleaned.format, 'JPEG')
+        self.assertEqual(cleaned.quantization,
+                         open_image(buffer.getvalue()).quantization)
+        self.assertNotIn('exif', cleaned.info)
+
+    def test_jpeg_rotated_by_exif(self):
+        original = create_image('JPEG', (64, 32), exif=exif(Orientation=6))
+        image, content = _clean_original(open_image(original))
+        cleaned = open_image(content)
+        self.assertEqual(cleaned.size, (32, 64))
+        self.assertEqual(image.size, (32, 64))
+        self.assertNotIn('exif', cleaned.info)
+
+    def test_gif_keeps_animation(self):
+        frames = [Image.new('P', (16, 16), color) for color in (1, 2, 3)]
+        buffer = BytesIO()
+        frames[0].save(buffer, 'GIF', save_all=True,
+                       append_images=frames[1:], duration=100, loop=0)
+        _, content = _clean_original(open_image(buffer.getvalue()))
+        self.assertEqual(open_image(content).n_frames, 3)
+
+
+@override_settings(IMAGE_PROCESSING_ASYNC=False)
+class RecipeImageTest(MediaTestCase):
+    """Новая картинка рецепта сбрасывает уменьшенные копии."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user()
+        cls.tags = create_tags(1)
+        cls.ingredients = create_ingredients(1)
+
+    def setUp(self):
+        super().setUp()
+        name = content_addressed_storage.save(
+            'recipes/images/old.png', ContentFile(create_image()))
+        self.recipe = create_recipe(
+            self.author, self.tags, self.ingredients, image=name)
+        process_recipe_image(self.recipe.pk)
+        self.recipe.refresh_from_db()
+        self.client.force_authenticate(self.author)
+
+    def patch_image(self, content):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.patch(
+                f'/api/recipes/{self.recipe.pk}/',
+                {
+                    'tags': [tag.pk for tag in self.tags],
+                    'ingredients': [
+                        {'id': ingredient.pk, 'amount': 1}
+                        for ingredient in self.ingredients
+                    ],
+                    'image': image_data_url(content),
+                },
+                format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.recipe.refresh_from_db()
+        return callbacks
+
+    def test_patch_resets_renditions(self):
+        callbacks = self.patch_image(create_image(size=(16, 16)))
+        self.assertEqual(self.recipe.image_thumbnail, '')
+        self.assertEqual(self.recipe.image_medium, '')
+        for callback in callbacks:
+            callback()
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            self.recipe.image_thumbnail.name,
+            rendition_name(self.recipe.image.name, 'thumbnail'))
+
+    def test_patch_same_image(self):
+        thumbnail = self.recipe.image_thumbnail.name
+        with self.recipe.image.open('rb') as image_file:
+            self.patch_image(image_file.read())
+        self.assertEqual(self.recipe.image_thumbnail.name, thumbnail)
@@ -0,0 +1,44 @@
+from unittest import mock
+
+from recipes import user_lists
+from recipes.models import FavoriteRecipes
+from recipes.tests.cases import CacheTestCase
+from recipes.tests.factories import create_recipe, create_user
+
+
+class UserListsCacheTest(CacheTestCase):
+    """Кэш списков пользователя сбрасывается после изменения списков."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.recipe = create_recipe(create_user())
+
+    def add_favorite(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            FavoriteRecipes.objects.create(user=self.user, recipe=self.recipe)
+
+    def test_invalidated_on_change(self):
+        self.assertEqual(
+            user_lists.get_user_lists(self.user.pk).favorited, frozenset())
+        self.add_favorite()
+        self.assertEqual(
+            user_lists.get_user_lists(self.user.pk).favorited,
+            {self.recipe.pk})
+
+    def test_late_write_is_not_served(self):
+        # Запрос прочитал списки до фиксации изменения, а записал их
+        # в кэш уже после сброса.
+        load = user_lists._load_user_lists
+
+        def slow_load(user_id):
+            lists = load(user_id)
+            self.add_favorite()
+            return lists
+
+        with mock.patch.object(user_lists, '_load_user_lists', slow_load):
+            stale = user_lists.get_user_lists(self.user.pk)
+        self.assertEqual(stale.favorited, frozenset())
+        self.assertEqual(
+            user_lists.get_user_lists(self.user.pk).favorited,
+            {self.recipe.pk})
@@ -0,0 +1,50 @@
+from recipes.tests.cases import CacheTestCase
+from recipes.tests.factories import create_recipe, create_user
+from recipes.versions import RECIPES_VERSION_KEY, get_version
+
+
+class AuthorVersionTest(CacheTestCase):
+    """Версия рецептов меняется только при изменении автора в ленте."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user(password='author-password')
+        create_recipe(cls.author)
+        cls.author.refresh_from_db()
+
+    def assert_version_changes(self, action, changed=True):
+        before = get_version(RECIPES_VERSION_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            action()
+        if changed:
+            self.assertNotEqual(get_version(RECIPES_VERSION_KEY), before)
+        else:
+            self.assertEqual(get_version(RECIPES_VERSION_KEY), before)
+
+    def test_login(self):
+        def login():
+            response = self.client.post(
+                '/api/auth/token/login/',
+                {'email': self.author.email, 'password': 'author-password'})
+            self.assertEqual(response.status_code, 200)
+        self.assert_version_changes(login, changed=False)
+
+    def test_signup(self):
+        self.assert_version_changes(create_user, changed=False)
+
+    def test_unchanged_save(self):
+        self.assert_version_changes(self.author.save, changed=False)
+
+    def test_user_without_recipes(self):
+        user = create_user()
+
+        def rename():
+            user.first_name = 'Новое имя'
+            user.save()
+        self.assert_version_changes(rename, changed=False)
+
+    def test_author_renamed(self):
+        def rename():
+            self.author.first_name = 'Новое имя'
+            self.author.save(update_fields=['first_name'])
+        self.assert_version_changes(rename)
@@ -0,0 +1,60 @@
+"""Кэш списков пользователя: избранное, корзина и подписки.
+
+Списки загружаются одним запросом (UNION трех таблиц) и хранятся
+в общем кэше под ключом с поколением пользователя. Изменение списков
+меняет поколение, поэтому запоздалая запись запроса, прочитавшего старые
+данные, попадает под старый ключ и больше не читается.
+"""
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db.models import F, IntegerField, Value
+
+from .models import FavoriteRecipes, ShoppingCarts
+from .versions import bump_version, get_version
+from users.models import Subscription
+
+USER_LISTS_KEY = 'recipes:user-lists:{}:{}'
+USER_LISTS_GENERATION_KEY = 'recipes:user-lists:{}:generation'
+# Записи старых поколений не читаются и удаляются по истечении срока.
+USER_LISTS_TIMEOUT = 60 * 60 * 24
+FAVORITED, IN_CART, SUBSCRIBED = range(3)
+
+UserLists = namedtuple('UserLists', ('favorited', 'in_cart', 'subscribed'))
+EMPTY_USER_LISTS = UserLists(frozenset(), frozenset(), frozenset())
+
+
+def _load_user_lists(user_id):
+    def ids(model, kind, field):
+        return (
+            model.objects
+            .filter(user_id=user_id)
+            .order_by()
+            .values_list(Value(kind, output_field=IntegerField()),
+                         F(field))
+        )
+    rows = ids(FavoriteRecipes, FAVORITED, 'recipe_id').union(
+        ids(ShoppingCarts, IN_CART, 'recipe_id'),
+        ids(Subscription, SUBSCRIBED, 'author_id'),
+        all=True
+    )
+    lists = ([], [], [])
+    for kind, object_id in rows:
+        lists[kind].append(object_id)
+    return UserLists(*map(frozenset, lists))
+
+
+def get_user_lists(user_id):
+    if user_id is None:
+        return EMPTY_USER_LISTS
+    generation = get_version(USER_LISTS_GENERATION_KEY.format(user_id))
+    key = USER_LISTS_KEY.format(user_id, generation)
+    lists = cache.get(key)
+    if lists is None:
+        lists = _load_user_lists(user_id)
+        cache.set(key, lists, USER_LISTS_TIMEOUT)
+    return lists
+
+
+def invalidate_user_lists(user_id):
+    bump_version(USER_LISTS_GENERATION_KEY.format(user_id))
@@ -0,0 +1,51 @@
+"""Версии данных в общем кэше Django.
+
+Версия меняется после фиксации транзакции, в которой изменились данные.
+По ней процессы сбрасывают свои кэши, а API строит HTTP-валидаторы
+(ETag, Last-Modified). Значение версии - время изменения в наносекундах.
+
+Кэш должен быть общим для всех процессов (Redis, Memcached и т. п.):
+с кэшем в памяти процесса изменения из других воркеров и команд manage.py
+не видны, и клиенты получают устаревшие ответы 304.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+CATALOGUE_VERSION_KEY = 'recipes:catalogue:version'
+# Меняется при любых изменениях ленты, включая списки пользователей.
+FEED_VERSION_KEY = 'recipes:feed:version'
+# Меняется только при изменении данных, видимых анонимному пользователю.
+RECIPES_VERSION_KEY = 'recipes:recipes:version'
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+LOCAL_CACHE_WARNING = (
+    'Кэш хранится в памяти процесса: запущенный сервер не увидит новых '
+    'версий данных. Задайте общий кэш переменными CACHE_BACKEND и '
+    'CACHE_LOCATION.'
+)
+
+
+def is_shared_cache():
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key, callback=None):
+    def bump():
+        cache.set(key, time.time_ns(), None)
+        if callback is not None:
+            callback()
+    transaction.on_commit(bump)
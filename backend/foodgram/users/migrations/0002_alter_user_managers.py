@@ -0,0 +1,21 @@
+# Generated by Django 4.1.6 on 2026-10-18 17:48
+
+from django.db import migrations
+
+import users.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', users.models.UserManager()),
+            ],
+        ),
+    ]
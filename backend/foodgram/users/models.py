@@ -1,8 +1,25 @@
 from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import UserManager as DjangoUserManager
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
 
+class UserQuerySet(models.QuerySet):
+    def add_subscription_annotation(self, user_id):
+        return self.annotate(
+            is_subscribed=models.Exists(
+                Subscription.objects.filter(
+                    user_id=user_id,
+                    author__pk=models.OuterRef('pk')
+                )
+            )
+        )
+
+
+class UserManager(DjangoUserManager.from_queryset(UserQuerySet)):
+    pass
+
+
 class User(AbstractUser):
     first_name = models.CharField(_("first name"), max_length=150, blank=False)
     last_name = models.CharField(_("last name"), max_length=150, blank=False)
@@ -13,9 +30,17 @@ class User(AbstractUser):
         help_text=_(
             "Designates whether the user can log into this admin site."),
     )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Количество рецептов',
+        default=0)
+    subscribers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков',
+        default=0)
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'password', 'first_name', 'last_name']
 
+    objects = UserManager()
+
     class Meta:
         verbose_name = _("user")
         verbose_name_plural = _("users")